@@ -0,0 +1,149 @@
+import argparse
+import os
+import struct
+import sys
+from array import array
+from topology_stream import load_topology_json, strip_compression_suffix
+
+# File layout (little endian), CSR style:
+#   header  : magic, number of nodes (N), number of entries (M = 2 x edges), name width (W)
+#   offsets : (N + 1) x uint32  - neighbors of node i are entries offsets[i]..offsets[i+1]
+#   targets : M x uint32        - neighbor node index
+#   weights : M x float32       - edge weight (latency, ms)
+#   names   : N x W bytes       - node names, utf-8, NUL padded
+MAGIC = b'CNADJ\x00\x00\x01'
+HEADER = struct.Struct('<8sIII')
+INDEX_SUFFIX = '.adj'
+
+
+def index_path_for(topology_path):
+    """Returns the adjacency index path stored alongside a topology JSON file."""
+    root, _ = os.path.splitext(strip_compression_suffix(topology_path))
+    return root + INDEX_SUFFIX
+
+
+def write_adjacency_index(path, node_names, edges):
+    """
+    Writes a CSR adjacency index for an undirected topology.
+
+    Args:
+        path: Output file path.
+        node_names: Node names, in topology order.
+        edges: Iterable of (source_name, target_name, weight).
+    """
+    position = {name: i for i, name in enumerate(node_names)}
+    neighbours = [[] for _ in node_names]
+    for source, target, weight in edges:
+        weight = float(weight or 0)
+        neighbours[position[source]].append((position[target], weight))
+        neighbours[position[target]].append((position[source], weight))
+
+    offsets = array('I', [0])
+    targets = array('I')
+    weights = array('f')
+    for row in neighbours:
+        for target, weight in row:
+            targets.append(target)
+            weights.append(weight)
+        offsets.append(len(targets))
+
+    encoded_names = [name.encode('utf-8') for name in node_names]
+    name_width = max((len(name) for name in encoded_names), default=0)
+
+    for column in (offsets, targets, weights):
+        if column.itemsize != 4:
+            raise RuntimeError("adjacency index requires 4-byte array items")
+        if sys.byteorder == 'big':
+            column.byteswap()
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(node_names), len(targets), name_width))
+        f.write(offsets.tobytes())
+        f.write(targets.tobytes())
+        f.write(weights.tobytes())
+        for name in encoded_names:
+            f.write(name.ljust(name_width, b'\x00'))
+
+
+def read_node_neighbours(path, node_name):
+    """
+    Reads the neighbors of a single node from an adjacency index.
+
+    Only the header, the node's offsets, its neighbor slice and the names of those
+    neighbors are read, so the cost is O(degree) for StatefulSet names
+    (gossip-statefulset-<i> is looked up at row i directly).
+
+    Returns:
+        A list of (neighbor_name, weight), or None if the node is not in the index.
+    """
+    with open(path, 'rb') as f:
+        magic, num_nodes, num_entries, name_width = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not an adjacency index: {path}")
+
+        offsets_start = HEADER.size
+        targets_start = offsets_start + 4 * (num_nodes + 1)
+        weights_start = targets_start + 4 * num_entries
+        names_start = weights_start + 4 * num_entries
+
+        def read_name(i):
+            f.seek(names_start + i * name_width)
+            return f.read(name_width).rstrip(b'\x00').decode('utf-8')
+
+        # StatefulSet ordinal gives the row directly; otherwise scan the name table
+        node_index = None
+        _, _, ordinal = node_name.rpartition('-')
+        if ordinal.isdigit() and int(ordinal) < num_nodes and read_name(int(ordinal)) == node_name:
+            node_index = int(ordinal)
+        else:
+            for i in range(num_nodes):
+                if read_name(i) == node_name:
+                    node_index = i
+                    break
+        if node_index is None:
+            return None
+
+        f.seek(offsets_start + 4 * node_index)
+        start, end = struct.unpack('<II', f.read(8))
+        targets = array('I')
+        weights = array('f')
+        f.seek(targets_start + 4 * start)
+        targets.frombytes(f.read(4 * (end - start)))
+        f.seek(weights_start + 4 * start)
+        weights.frombytes(f.read(4 * (end - start)))
+        if sys.byteorder == 'big':
+            targets.byteswap()
+            weights.byteswap()
+
+        return [(read_name(target), weight) for target, weight in zip(targets, weights)]
+
+
+def read_node_names(path):
+    """Reads the name table of an adjacency index (every node, in topology order)."""
+    with open(path, 'rb') as f:
+        magic, num_nodes, num_entries, name_width = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not an adjacency index: {path}")
+        f.seek(HEADER.size + 4 * (num_nodes + 1) + 8 * num_entries)
+        names = f.read(num_nodes * name_width)
+    return [names[i:i + name_width].rstrip(b'\x00').decode('utf-8')
+            for i in range(0, num_nodes * name_width, name_width)]
+
+
+def build_index_from_json(topology_path):
+    """Builds the adjacency index of an existing node-link topology JSON file."""
+    topology = load_topology_json(topology_path)
+    node_names = [node['id'] for node in topology['nodes']]
+    edges = ((edge['source'], edge['target'], edge.get('weight')) for edge in topology['edges'])
+    path = index_path_for(topology_path)
+    write_adjacency_index(path, node_names, edges)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build adjacency index (.adj) files for topology JSON files")
+    parser.add_argument('topologies', nargs='+', help="Topology JSON file(s)")
+    args = parser.parse_args()
+
+    for topology_path in args.topologies:
+        print(f"Adjacency index saved to {build_index_from_json(topology_path)}")
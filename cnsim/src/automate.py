@@ -7,16 +7,30 @@ import time
 import uuid
 import select
 import random
+import threading
 from datetime import datetime, timedelta, timezone
 import os
+import grpc
+import gossip_pb2
+import gossip_pb2_grpc
+from campaign import Campaign, CoverageTracker
+from kubernetes import client, config, watch
 
 class Test:
-    def __init__(self, num_tests, helm_args, topology_file):
+    def __init__(self, num_tests, helm_args, topology_file, grpc_target='portforward'):
         # Getting test details
         self.num_tests = num_tests
         self.helm_args = helm_args  # Store Helm arguments as a dictionary
         self.gossip_delay = float(helm_args.get('gossipDelay', 5.0))  # Default 2s
         self.topology_file = topology_file
+        # How the Initiate RPC reaches a pod: 'portforward' (kubectl) or 'podip' (in-cluster runner)
+        self.grpc_target = grpc_target
+        # pod_name -> (kubectl port-forward process, local port), reused across tests
+        self.port_forwards = {}
+        self.port_forwards_lock = threading.Lock()
+        # Kubernetes API clients, created on first use
+        self.core_api = None
+        self.apps_api = None
         print(f"self.num_tests = {self.num_tests}", flush=True)
         print(f'self.helm_args = {self.helm_args}', flush=True)
         print(f'self.topology_file = {self.topology_file}', flush=True)
@@ -60,52 +74,118 @@ class Test:
             traceback.print_exc()
             sys.exit(1)
 
-    def wait_for_pods_to_be_ready(self, namespace='default', expected_pods=0, timeout=1000):
+    def _kubernetes_apis(self):
+        """Returns the (CoreV1Api, AppsV1Api) clients, loading the kube config on first use."""
+        if self.core_api is None:
+            try:
+                config.load_kube_config()
+            except config.ConfigException:
+                # Running inside the cluster
+                config.load_incluster_config()
+            self.core_api = client.CoreV1Api()
+            self.apps_api = client.AppsV1Api()
+        return self.core_api, self.apps_api
+
+    def wait_for_pods_to_be_ready(self, namespace='default', expected_pods=0, timeout=1000,
+                                  statefulset='gossip-statefulset', label_selector='app=bcgossip'):
         """
-        Waits for all pods in the specified namespace to be ready.
+        Waits until the StatefulSet reports expected_pods ready replicas. Status
+        changes are followed with a watch, so this returns as soon as the last
+        pod becomes ready instead of on the next poll.
         """
-        print(f"Checking for pods in namespace {namespace}...", flush=True)
-        start_time = time.time()
-        get_pods_cmd = f"kubectl get pods -n {namespace} --no-headers | grep Running | wc -l"
+        print(f"Watching statefulset {statefulset} in namespace {namespace}...", flush=True)
+        _, apps_api = self._kubernetes_apis()
+        field_selector = f"metadata.name={statefulset}"
+        deadline = time.time() + timeout
+        ready = -1
 
-        while time.time() - start_time < timeout:
+        while time.time() < deadline:
             try:
-                result = subprocess.run(get_pods_cmd, shell=True,
-                                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                running_pods = int(result.stdout.strip())
-                if running_pods >= expected_pods:
-                    print(f"All {expected_pods} pods are up and running in namespace {namespace}.", flush=True)
-                    return True
-                else:
-                    print(f" {running_pods} pods are up for now in namespace {namespace}. Waiting...", flush=True)
-            except subprocess.CalledProcessError as e:
-                print(f"Error checking for pods: {e.stderr}", flush=True)
-                return False
-            time.sleep(1)
-        print(f"Timeout waiting for pods to terminate in namespace {namespace}.", flush=True)
+                ret = apps_api.list_namespaced_stateful_set(namespace, field_selector=field_selector)
+                statefulsets = ret.items
+                stream = None
+                while True:
+                    current = max((item.status.ready_replicas or 0 for item in statefulsets), default=0)
+                    if current != ready:
+                        ready = current
+                        print(f" {ready} pods are ready for now in namespace {namespace}.", flush=True)
+                    if statefulsets and ready >= expected_pods:
+                        print(f"All {expected_pods} pods are up and running in namespace {namespace}.", flush=True)
+                        self.report_pod_readiness(namespace, label_selector)
+                        return True
+                    if stream is None:
+                        stream = watch.Watch().stream(apps_api.list_namespaced_stateful_set, namespace,
+                                                      field_selector=field_selector,
+                                                      resource_version=ret.metadata.resource_version,
+                                                      timeout_seconds=max(int(deadline - time.time()), 1))
+                    event = next(stream, None)
+                    if event is None:
+                        break
+                    statefulsets = [] if event['type'] == 'DELETED' else [event['object']]
+            except client.ApiException as e:
+                # 410 Gone: the resource version expired, list again
+                if e.status != 410:
+                    print(f"Error watching statefulset {statefulset}: {e.reason}", flush=True)
+                    time.sleep(1)
+        print(f"Timeout waiting for pods to be ready in namespace {namespace}.", flush=True)
         return False
 
-    def wait_for_pods_to_be_down(self, namespace='default', timeout=1000):
+    def report_pod_readiness(self, namespace='default', label_selector='app=bcgossip'):
+        """Prints how long each pod took from creation to Ready, and a summary."""
+        core_api, _ = self._kubernetes_apis()
+        latencies = {}
+        for pod in core_api.list_namespaced_pod(namespace, label_selector=label_selector).items:
+            for condition in pod.status.conditions or []:
+                if condition.type == 'Ready' and condition.status == 'True':
+                    latencies[pod.metadata.name] = (condition.last_transition_time -
+                                                    pod.metadata.creation_timestamp).total_seconds()
+        for pod_name, latency in sorted(latencies.items()):
+            print(json.dumps({'event': 'pod_ready', 'pod_name': pod_name, 'ready_s': latency}), flush=True)
+        if latencies:
+            slowest = max(latencies, key=latencies.get)
+            print(json.dumps({
+                'event': 'pods_ready_summary',
+                'pods': len(latencies),
+                'min_ready_s': min(latencies.values()),
+                'mean_ready_s': sum(latencies.values()) / len(latencies),
+                'max_ready_s': latencies[slowest],
+                'slowest_pod': slowest
+            }), flush=True)
+
+    def wait_for_pods_to_be_down(self, namespace='default', timeout=1000, label_selector='app=bcgossip'):
         """
-        Waits for all pods in the specified namespace to be down.
+        Waits until all gossip pods in the specified namespace are deleted,
+        following the deletions with a watch.
         """
         print(f"Checking for pods in namespace {namespace}...", flush=True)
-        start_time = time.time()
-        get_pods_cmd = f"kubectl get pods -n {namespace} --no-headers | grep Terminating | wc -l"
+        core_api, _ = self._kubernetes_apis()
+        deadline = time.time() + timeout
 
-        while time.time() - start_time < timeout:
+        while time.time() < deadline:
             try:
-                result = subprocess.run(get_pods_cmd, shell=True,
-                                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                if "No resources found" in result.stderr:
+                ret = core_api.list_namespaced_pod(namespace, label_selector=label_selector)
+                remaining = {pod.metadata.name for pod in ret.items}
+                if not remaining:
                     print(f"No pods found in namespace {namespace}.", flush=True)
                     return True
-                else:
-                    print(f"Pods still exist in namespace {namespace}. Waiting...", flush=True)
-            except subprocess.CalledProcessError as e:
-                print(f"Error checking for pods: {e.stderr}", flush=True)
-                return False
-            time.sleep(1)
+                print(f"{len(remaining)} pods still exist in namespace {namespace}. Waiting...", flush=True)
+                stream = watch.Watch().stream(core_api.list_namespaced_pod, namespace,
+                                              label_selector=label_selector,
+                                              resource_version=ret.metadata.resource_version,
+                                              timeout_seconds=max(int(deadline - time.time()), 1))
+                for event in stream:
+                    if event['type'] == 'DELETED':
+                        remaining.discard(event['object'].metadata.name)
+                    elif event['type'] == 'ADDED':
+                        remaining.add(event['object'].metadata.name)
+                    if not remaining:
+                        print(f"No pods found in namespace {namespace}.", flush=True)
+                        return True
+            except client.ApiException as e:
+                # 410 Gone: the resource version expired, list again
+                if e.status != 410:
+                    print(f"Error watching pods: {e.reason}", flush=True)
+                    time.sleep(1)
         print(f"Timeout waiting for pods to terminate in namespace {namespace}.", flush=True)
         return False
 
@@ -124,9 +204,9 @@ class Test:
             print(f"Error getting number of pods: {e.stderr}", flush=True)
             return 0
 
-    def select_random_pod(self):
+    def get_running_pods(self):
         """
-        Select a random running pod and return its IP address.
+        Returns the names of the running pods.
         """
         command = "kubectl get pods --no-headers | grep Running | awk '{print $1}'"
         # command = "kubectl get pods --no-headers -o wide | grep Running | awk '{print $6}'"
@@ -134,7 +214,13 @@ class Test:
         pod_name_list = stdout.split()
         if not pod_name_list:
             raise Exception("No running pods found.")
-        return random.choice(pod_name_list)
+        return pod_name_list
+
+    def select_random_pod(self):
+        """
+        Select a random running pod and return its IP address.
+        """
+        return random.choice(self.get_running_pods())
 
     def _get_malaysian_time(self):
         """Helper function to get the current time in Malaysian timezone (UTC+8)."""
@@ -209,11 +295,151 @@ class Test:
             traceback.print_exc()
             return False
 
+    def get_pod_ip(self, pod_name):
+        """Returns the IP address of a pod."""
+        stdout, _ = self.run_command(['kubectl', 'get', 'pod', pod_name, '-o', 'jsonpath={.status.podIP}'],
+                                     suppress_output=True)
+        return stdout.strip()
+
+    def open_port_forward(self, pod_name):
+        """
+        Forwards a local port to the gossip port (5050) of a pod and returns the
+        local port. The forward is kept open and reused until close_port_forwards().
+        """
+        with self.port_forwards_lock:
+            return self._open_port_forward(pod_name)
+
+    def _open_port_forward(self, pod_name):
+        if pod_name in self.port_forwards:
+            process, local_port = self.port_forwards[pod_name]
+            if process.poll() is None:
+                return local_port
+        # ':5050' lets kubectl pick a free local port, reported on its first output line
+        process = subprocess.Popen(['kubectl', 'port-forward', f'pod/{pod_name}', ':5050'],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        line = process.stdout.readline()
+        match = re.search(r':(\d+) -> 5050', line)
+        if not match:
+            process.kill()
+            raise Exception(f"kubectl port-forward to {pod_name} failed: {line or process.stderr.read()}")
+        local_port = int(match.group(1))
+        # kubectl prints a line per forwarded connection; keep draining it so the pipe never fills up
+        threading.Thread(target=process.stdout.read, daemon=True).start()
+        self.port_forwards[pod_name] = (process, local_port)
+        return local_port
+
+    def close_port_forwards(self):
+        with self.port_forwards_lock:
+            for process, _ in self.port_forwards.values():
+                process.terminate()
+            self.port_forwards = {}
+
+    def get_grpc_target(self, pod_name):
+        """Returns the address the Initiate RPC of a pod is reachable at."""
+        if self.grpc_target == 'podip':
+            return f"{self.get_pod_ip(pod_name)}:5050"
+        return f"127.0.0.1:{self.open_port_forward(pod_name)}"
+
+    def initiate_gossip_grpc(self, pod_name, unique_id, iteration, total_nodes):
+        """
+        Initiates gossip by calling the Initiate RPC of the pod directly, instead of
+        running start.py through kubectl exec, and logs the node's timing metadata.
+        """
+
+        time.sleep(self.gossip_delay)  # Use configurable delay
+
+        message = f'{unique_id}-cubaan{total_nodes}-{iteration}'
+        try:
+            target = self.get_grpc_target(pod_name)
+
+            start_time = self._get_malaysian_time().strftime('%Y/%m/%d %H:%M:%S')
+            start_log = {
+                'event': 'gossip_start',
+                'pod_name': pod_name,
+                'message': message,
+                'start_time': start_time,
+                'details': f"Gossip propagation started for message: {message}"
+            }
+            print(json.dumps(start_log), flush=True)
+
+            request_start = time.time_ns()
+            with grpc.insecure_channel(target) as channel:
+                stub = gossip_pb2_grpc.GossipServiceStub(channel)
+                reply = stub.Initiate(gossip_pb2.InitiateRequest(message=message, message_id=uuid.uuid4().hex),
+                                      timeout=3000)
+            request_ms = (time.time_ns() - request_start) / 1e6
+
+            end_time_log = self._get_malaysian_time().strftime('%Y/%m/%d %H:%M:%S')
+            end_log = {
+                'event': 'gossip_end',
+                'pod_name': pod_name,
+                'message': message,
+                'message_id': reply.message_id,
+                'end_time': end_time_log,
+                'received_timestamp': reply.received_timestamp,
+                'completed_timestamp': reply.completed_timestamp,
+                'duration_ms': reply.duration_ms,
+                # Time spent outside the node: channel setup, transport and port-forward
+                'trigger_overhead_ms': request_ms - reply.duration_ms,
+                'details': f"Gossip propagation completed for message: {message} ({reply.details})"
+            }
+            print(json.dumps(end_log), flush=True)
+            return True
+
+        except Exception as e:
+            error_log = {
+                'event': 'gossip_error',
+                'pod_name': pod_name,
+                'message': message,
+                'error': str(e),
+                'details': f"Error initiating gossip on pod {pod_name}: {e}"
+            }
+            print(json.dumps(error_log), flush=True)
+            traceback.print_exc()
+            return False
+
+    def reload_topology(self, filename, timeout=600):
+        """
+        Switches the running deployment to another topology file through the Reload
+        RPC of one pod, which broadcasts it to the others, instead of reinstalling
+        the Helm chart. The file must be present in every pod's topology folder.
+        """
+        pod_name = self.select_random_pod()
+        try:
+            target = self.get_grpc_target(pod_name)
+            with grpc.insecure_channel(target) as channel:
+                stub = gossip_pb2_grpc.GossipServiceStub(channel)
+                reply = stub.Reload(gossip_pb2.ReloadRequest(filename=filename, broadcast=True), timeout=timeout)
+            reload_log = {
+                'event': 'topology_reload',
+                'pod_name': pod_name,
+                'filename': reply.filename,
+                'pods_reloaded': reply.pods_reloaded,
+                'pods_failed': reply.pods_failed,
+                'duration_ms': reply.duration_ms,
+                'details': reply.details
+            }
+            print(json.dumps(reload_log), flush=True)
+            self.topology_file = filename
+            return reply.pods_failed == 0
+
+        except Exception as e:
+            error_log = {
+                'event': 'topology_reload_error',
+                'pod_name': pod_name,
+                'filename': filename,
+                'error': str(e),
+                'details': f"Error reloading topology {filename} through pod {pod_name}: {e}"
+            }
+            print(json.dumps(error_log), flush=True)
+            traceback.print_exc()
+            return False
+
     def extract_topology_info(self):
         """Extracts total_nodes and model from the topology filename."""
         nodes_match = re.search(r'nodes(\d+)_', self.topology_file)
         total_nodes = int(nodes_match.group(1)) if nodes_match else None
-        model_match = re.search(r'_([A-Z]+)\d*\.json$', self.topology_file)
+        model_match = re.search(r'_([A-Z]+)\d*\.(?:json(?:\.gz|\.zst)?|cnt)$', self.topology_file)
         model = model_match.group(1) if model_match else None
         return total_nodes, model
 
@@ -233,8 +459,22 @@ if __name__ == '__main__':
     # Parse arguments
     parser = argparse.ArgumentParser(description="Usage: python automate.py --num_tests <number_of_tests> --set key1=value1 key2=value2 ...")
     parser.add_argument('--num_tests', required=True, type=int, help="Total number of tests to do")
-    parser.add_argument('--filename', required=True, type=str, help="Topology filename")
+    parser.add_argument('--filename', required=True, type=str, nargs='+',
+                        help="Topology filename(s); further files with the same node count are run on the same "
+                             "deployment through the Reload RPC")
     parser.add_argument('--set', action='append', help="Helm --set arguments in key=value format", default=[])
+    parser.add_argument('--trigger', default='exec', choices=['exec', 'grpc'],
+                        help="Start gossip with kubectl exec + start.py, or with the Initiate RPC (default: exec)")
+    parser.add_argument('--grpc_target', default='portforward', choices=['portforward', 'podip'],
+                        help="Reach pods through kubectl port-forward, or by pod IP when running in-cluster (default: portforward)")
+    parser.add_argument('--campaign', action='store_true',
+                        help="Pipeline the tests: start gossips through the Initiate RPC and detect completion from node events")
+    parser.add_argument('--concurrency', type=int, default=1, help="Campaign: gossips in flight at once (default: 1)")
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help="Campaign: Poisson arrival rate in gossips/s, 0 for back-to-back (default: 0)")
+    parser.add_argument('--gossip_timeout', type=float, default=300, help="Campaign: max seconds per gossip (default: 300)")
+    parser.add_argument('--idle_timeout', type=float, default=5.0,
+                        help="Campaign: a gossip is over after this many seconds without new events (default: 5)")
     args = parser.parse_args()
 
     # Convert --set arguments into a dictionary
@@ -243,10 +483,21 @@ if __name__ == '__main__':
         key, value = s.split('=', 1)
         helm_args[key] = value
 
-    test = Test(args.num_tests, helm_args, args.filename)  # Pass the Helm arguments to Test
-    if test.checkFileExist():
+    test = Test(args.num_tests, helm_args, args.filename[0], args.grpc_target)  # Pass the Helm arguments to Test
+    total_nodes, model = test.extract_topology_info()
+    # Every topology runs on the same StatefulSet, so all of them need the same number of nodes
+    topologies_ok = True
+    for filename in args.filename:
+        test.topology_file = filename
+        if not test.checkFileExist():
+            topologies_ok = False
+        elif test.extract_topology_info()[0] != total_nodes:
+            print(f"Error: {filename} does not have {total_nodes} nodes like {args.filename[0]}", flush=True)
+            topologies_ok = False
+    test.topology_file = args.filename[0]
+
+    if topologies_ok:
 
-        total_nodes, model = test.extract_topology_info()
         print(f"totalNodes confirmed: {total_nodes}", flush=True)
 
         # bind helm totalNodes value
@@ -256,7 +507,7 @@ if __name__ == '__main__':
 
         # bind helm filename value
         if args.filename is not None:
-            helm_args['filename'] = args.filename
+            helm_args['filename'] = args.filename[0]
             print(f"helm_args['filename']: {helm_args['filename']}", flush=True)
 
         # test = Test(args.num_tests, helm_args)  # Pass the Helm arguments to Test
@@ -276,16 +527,41 @@ if __name__ == '__main__':
 
             # Wait for pods to be ready
             if test.wait_for_pods_to_be_ready(namespace='default', expected_pods=int(total_nodes), timeout=1000):
-                unique_id = str(uuid.uuid4())[:4]
-
-                # Test iteration starts here
-                for nt in range(0, test.num_tests + 1):
-                    pod_name = test.select_random_pod()
-                    print(f"Selected pod: {pod_name}", flush=True)
-                    if test.access_pod_and_initiate_gossip(pod_name, unique_id, nt, total_nodes):
-                        print(f"Test {nt} complete.", flush=True)
+                tracker = pods = None
+                if args.campaign:
+                    # Completion comes from the node events, followed on all pods at once
+                    pods = test.get_running_pods()
+                    tracker = CoverageTracker(total_nodes)
+                    tracker.follow_pods('app=bcgossip', len(pods))
+                    time.sleep(test.gossip_delay)  # Let the log streams attach
+
+                for topology_index, filename in enumerate(args.filename):
+                    # Later topologies are swapped in without reinstalling the chart
+                    if topology_index > 0 and not test.reload_topology(filename):
+                        print(f"Skipping tests of {filename}: the topology reload failed.", flush=True)
+                        continue
+                    unique_id = str(uuid.uuid4())[:4]
+
+                    if args.campaign:
+                        campaign = Campaign(test, pods, total_nodes, tracker, args.concurrency, args.rate,
+                                            args.gossip_timeout, args.idle_timeout)
+                        campaign.run(unique_id, test.num_tests + 1)
                     else:
-                        print(f"Test {nt} failed.", flush=True)
+                        # Test iteration starts here
+                        for nt in range(0, test.num_tests + 1):
+                            pod_name = test.select_random_pod()
+                            print(f"Selected pod: {pod_name}", flush=True)
+                            if args.trigger == 'grpc':
+                                initiated = test.initiate_gossip_grpc(pod_name, unique_id, nt, total_nodes)
+                            else:
+                                initiated = test.access_pod_and_initiate_gossip(pod_name, unique_id, nt, total_nodes)
+                            if initiated:
+                                print(f"Test {nt} complete.", flush=True)
+                            else:
+                                print(f"Test {nt} failed.", flush=True)
+                if tracker is not None:
+                    tracker.stop()
+                test.close_port_forwards()
             else:
                 print(f"Failed to prepare pods for {helmname}.", flush=True)
 
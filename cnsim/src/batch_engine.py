@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+from collections import namedtuple
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import dijkstra
+from topology_binary import BINARY_SUFFIX, load_topology_binary
+from topology_stream import load_topology_json
+
+# Elements of the (runs, edges) temporaries computed at once (a few MB per array)
+EDGE_BLOCK_ELEMENTS = 1 << 20
+
+BatchResult = namedtuple('BatchResult', ['initiators', 'arrival_times', 'hops', 'duplicates', 'last_event_times'])
+
+
+class BatchEngine:
+    """
+    Vectorized propagation engine for batch experiments.
+
+    With full flooding and parallel fan-out, every node first receives a gossip
+    along its shortest-latency path from the initiator, so arrival times for many
+    initiators are one multi-source Dijkstra call on a SciPy sparse matrix. Hop
+    counts follow the resulting predecessor trees, and duplicates are derived from
+    them: a node forwards to every neighbor except its own sender, so node v gets
+    degree(v) - children(v) copies, all but the first being duplicates.
+    """
+
+    def __init__(self, node_names, sources, targets, weights):
+        """
+        Args:
+            node_names: Node names, in topology order.
+            sources, targets: Node indices of the edge end points.
+            weights: Edge weights (latency, ms).
+        """
+        self.node_names = list(node_names)
+        num_nodes = len(self.node_names)
+        self.sources = sources = np.asarray(sources, dtype=np.int32)
+        self.targets = targets = np.asarray(targets, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        # Explicitly stored zeros are kept as (zero latency) edges by csgraph
+        self.matrix = sparse.csr_array((self.weights, (sources, targets)), shape=(num_nodes, num_nodes))
+        self.degree = (np.bincount(sources, minlength=num_nodes) +
+                       np.bincount(targets, minlength=num_nodes))
+
+    @classmethod
+    def from_graph(cls, graph, weight='weight'):
+        """Builds the engine from a networkx graph (e.g. from network_constructor.py)."""
+        node_names = list(graph.nodes)
+        position = {node: i for i, node in enumerate(node_names)}
+        edges = list(graph.edges(data=weight, default=0))
+        return cls(node_names,
+                   [position[u] for u, _, _ in edges],
+                   [position[v] for _, v, _ in edges],
+                   [w for _, _, w in edges])
+
+    @classmethod
+    def from_topology_file(cls, path, latency_option='weight'):
+        """Builds the engine from a topology json (node-link) or binary (.cnt) file."""
+        if path.endswith(BINARY_SUFFIX):
+            topology = load_topology_binary(path)
+            return cls([name.decode('utf-8') for name in topology.names],
+                       topology.sources, topology.targets, topology.weights)
+        topology = load_topology_json(path)
+        node_names = [node['id'] for node in topology['nodes']]
+        position = {name: i for i, name in enumerate(node_names)}
+        edges = topology['edges']
+        return cls(node_names,
+                   [position[edge['source']] for edge in edges],
+                   [position[edge['target']] for edge in edges],
+                   [edge.get(latency_option) or 0 for edge in edges])
+
+    def run(self, initiators):
+        """
+        Propagates one gossip from each initiator (array of node indices).
+
+        Returns:
+            BatchResult of (len(initiators), num_nodes) arrays: arrival_times (ms,
+            inf when unreachable), hops (-1 when unreachable) and duplicates, plus
+            last_event_times (ms) with the latest delivery of each gossip.
+        """
+        initiators = np.atleast_1d(np.asarray(initiators, dtype=np.int32))
+        num_runs = len(initiators)
+        num_nodes = len(self.node_names)
+
+        arrival_times, predecessors = dijkstra(self.matrix, directed=False, indices=initiators,
+                                               return_predecessors=True)
+        reached = np.isfinite(arrival_times)
+        has_parent = predecessors >= 0
+
+        # Hop counts by pointer jumping over the predecessor trees (log(depth) rounds)
+        rows = np.arange(num_runs)[:, None]
+        ancestors = np.where(has_parent, predecessors, np.arange(num_nodes)[None, :])
+        hops = has_parent.astype(np.int64)
+        while True:
+            next_ancestors = ancestors[rows, ancestors]
+            if np.array_equal(next_ancestors, ancestors):
+                break
+            hops = hops + hops[rows, ancestors]
+            ancestors = next_ancestors
+        hops[~reached] = -1
+
+        # children[r, v]: nodes whose first copy came from v in run r
+        flat_parents = (rows * num_nodes + predecessors)[has_parent]
+        children = np.bincount(flat_parents, minlength=num_runs * num_nodes).reshape(num_runs, num_nodes)
+        receptions = np.where(reached, self.degree[None, :] - children, 0)
+        # Every reached node except the initiator counts its first copy as 'received'
+        duplicates = receptions - (reached & has_parent)
+
+        # The last event of a gossip is its latest delivery, duplicates included: every
+        # reached node sends over each of its edges except the one to its own sender.
+        # Edges are taken in blocks, so the temporaries are (runs, block) and not (runs, edges)
+        last_event_times = np.nanmax(np.where(reached, arrival_times, np.nan), axis=1)
+        block = max(1, EDGE_BLOCK_ELEMENTS // num_runs)
+        for senders, receivers in ((self.sources, self.targets), (self.targets, self.sources)):
+            for start in range(0, len(senders), block):
+                edges = slice(start, start + block)
+                block_senders = senders[edges]
+                sends = reached[:, block_senders] & (predecessors[:, block_senders] != receivers[None, edges])
+                delivered = np.where(sends, arrival_times[:, block_senders] + self.weights[None, edges], -np.inf)
+                last_event_times = np.maximum(last_event_times, delivered.max(axis=1))
+
+        return BatchResult(initiators, arrival_times, hops, duplicates, last_event_times)
+
+    def summarize(self, result):
+        """Returns one summary dictionary per gossip of a BatchResult."""
+        reached = np.isfinite(result.arrival_times)
+        num_nodes = len(self.node_names)
+        received = reached.sum(axis=1) - 1
+        duplicates = result.duplicates.sum(axis=1)
+        arrival = np.where(reached, result.arrival_times, np.nan)
+        summaries = []
+        for run, initiator in enumerate(result.initiators):
+            summaries.append({
+                'initiator': self.node_names[initiator],
+                'coverage': float(reached[run].sum() / num_nodes),
+                'messages_sent': int(received[run] + duplicates[run]),
+                'duplicates': int(duplicates[run]),
+                'last_received_ms': float(result.last_event_times[run]),
+                'last_arrival_ms': float(np.nanmax(arrival[run])),
+                'mean_arrival_ms': float(np.nanmean(np.delete(arrival[run], initiator))) if num_nodes > 1 else 0.0,
+                'max_hops': int(result.hops[run].max()),
+                'mean_hops': float(result.hops[run][reached[run]].mean()),
+            })
+        return summaries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vectorized gossip propagation statistics for many initiators")
+    parser.add_argument('--filename', required=True, help="Topology filename (json or .cnt)")
+    parser.add_argument('--num_tests', type=int, default=100, help="Number of random initiators (default: 100)")
+    parser.add_argument('--latency_option', default='weight', help="Edge attribute used as latency (default: weight)")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for initiator selection (optional)")
+    parser.add_argument('--chunk_size', type=int, default=256,
+                        help="Initiators propagated per vectorized call; bounds memory (default: 256)")
+    args = parser.parse_args()
+
+    path = args.filename if os.path.isfile(args.filename) else os.path.join(os.getcwd(), 'topology', args.filename)
+    engine = BatchEngine.from_topology_file(path, latency_option=args.latency_option)
+    rng = np.random.default_rng(args.seed)
+    initiators = rng.integers(0, len(engine.node_names), size=args.num_tests)
+    for start in range(0, len(initiators), args.chunk_size):
+        result = engine.run(initiators[start:start + args.chunk_size])
+        for summary in engine.summarize(result):
+            print(json.dumps(summary))
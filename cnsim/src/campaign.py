@@ -0,0 +1,213 @@
+import json
+import random
+import subprocess
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import grpc
+import gossip_pb2
+import gossip_pb2_grpc
+
+
+class CoverageTracker:
+    """
+    Tracks the progress of every gossip by message_id from the nodes' structured
+    events, so that completion is detected from what the nodes report rather
+    than from a fixed delay.
+    """
+
+    def __init__(self, total_nodes):
+        self.total_nodes = total_nodes
+        # message_id -> {'nodes': set of covered node IPs, 'duplicates': int,
+        #                'last_timestamp': ns, 'last_update': monotonic seconds}
+        self.gossips = {}
+        self._condition = threading.Condition()
+        self._process = None
+
+    def add_event(self, event_data):
+        message_id = event_data.get('message_id')
+        if not message_id or event_data.get('event_type') not in ('initiate', 'received', 'duplicate'):
+            return
+        with self._condition:
+            gossip = self.gossips.setdefault(message_id, self._new_gossip())
+            if event_data['event_type'] == 'duplicate':
+                gossip['duplicates'] += 1
+            else:
+                gossip['nodes'].add(event_data['receiver_id'])
+            gossip['last_timestamp'] = max(gossip['last_timestamp'], event_data['received_timestamp'])
+            gossip['last_update'] = time.monotonic()
+            self._condition.notify_all()
+
+    def add_line(self, line):
+        """Feeds one log line; lines that are not gossip events are ignored."""
+        line = line.strip()
+        if not line.startswith('{'):
+            return
+        try:
+            self.add_event(json.loads(line))
+        except (ValueError, KeyError):
+            pass
+
+    def follow_pods(self, label_selector, max_pods):
+        """Follows the logs of all matching pods with kubectl in a background thread."""
+        self._process = subprocess.Popen(['kubectl', 'logs', '-f', '-l', label_selector, '--tail=0',
+                                          f'--max-log-requests={max_pods}'],
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        thread = threading.Thread(target=self._read_process, name='coverage-tracker', daemon=True)
+        thread.start()
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process = None
+
+    def wait(self, message_id, timeout, idle_timeout):
+        """
+        Waits until every node received the gossip, no new event arrived for
+        idle_timeout seconds, or timeout expired.
+
+        Returns:
+            The coverage, duplicates, message overhead and last event timestamp (ns) of the gossip.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            gossip = self.gossips.setdefault(message_id, self._new_gossip())
+            while len(gossip['nodes']) < self.total_nodes:
+                now = time.monotonic()
+                idle_deadline = gossip['last_update'] + idle_timeout
+                if now >= deadline or now >= idle_deadline:
+                    break
+                self._condition.wait(min(deadline, idle_deadline) - now)
+            # Every node but the initiator got the message once, plus the duplicates
+            received = max(len(gossip['nodes']) - 1, 0)
+            messages = received + gossip['duplicates']
+            return {
+                'coverage': len(gossip['nodes']) / self.total_nodes,
+                'duplicates': gossip['duplicates'],
+                'messages_sent': messages,
+                # Messages sent per node reached (1.0 means no redundant message at all)
+                'message_overhead': messages / received if received else None,
+                'last_timestamp': gossip['last_timestamp'],
+            }
+
+    def forget(self, message_id):
+        with self._condition:
+            self.gossips.pop(message_id, None)
+
+    def _new_gossip(self):
+        return {'nodes': set(), 'duplicates': 0, 'last_timestamp': 0, 'last_update': time.monotonic()}
+
+    def _read_process(self):
+        for line in self._process.stdout:
+            self.add_line(line)
+
+
+class Campaign:
+    """
+    Runs many gossips against one deployment, started through the Initiate RPC
+    either back-to-back or with Poisson arrivals (rate gossips per second), with
+    at most `concurrency` gossips in flight. Each gossip is tracked by its own
+    message_id and is complete once the CoverageTracker says so.
+    """
+
+    def __init__(self, test, pods, total_nodes, tracker, concurrency=1, rate=0.0, gossip_timeout=300,
+                 idle_timeout=5.0):
+        self.test = test
+        self.pods = pods
+        self.total_nodes = total_nodes
+        self.tracker = tracker
+        self.concurrency = concurrency
+        self.rate = rate
+        self.gossip_timeout = gossip_timeout
+        self.idle_timeout = idle_timeout
+        self.results = []
+        self._lock = threading.Lock()
+
+    def run(self, unique_id, num_gossips):
+        slots = threading.BoundedSemaphore(self.concurrency)
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for iteration in range(num_gossips):
+                if self.rate > 0 and iteration > 0:
+                    time.sleep(random.expovariate(self.rate))
+                # Arrivals wait here while `concurrency` gossips are in flight
+                slots.acquire()
+                future = executor.submit(self._run_gossip, unique_id, iteration)
+                future.add_done_callback(lambda _: slots.release())
+        duration = time.time() - start
+
+        completion_times = [result['completion_ms'] for result in self.results if result.get('completion_ms')]
+        overheads = [result['message_overhead'] for result in self.results if result.get('message_overhead')]
+        summary = {
+            'event': 'campaign_summary',
+            'gossips': num_gossips,
+            'completed': sum(1 for result in self.results if result.get('coverage') == 1.0),
+            'concurrency': self.concurrency,
+            'rate': self.rate,
+            'duration_s': duration,
+            'throughput_per_s': num_gossips / duration if duration > 0 else 0.0,
+            'mean_completion_ms': sum(completion_times) / len(completion_times) if completion_times else None,
+            'max_completion_ms': max(completion_times, default=None),
+            'mean_message_overhead': sum(overheads) / len(overheads) if overheads else None,
+        }
+        print(json.dumps(summary), flush=True)
+        return summary
+
+    def _run_gossip(self, unique_id, iteration):
+        pod_name = random.choice(self.pods)
+        message = f'{unique_id}-cubaan{self.total_nodes}-{iteration}'
+        message_id = uuid.uuid4().hex
+        try:
+            target = self.test.get_grpc_target(pod_name)
+            self._log({
+                'event': 'gossip_start',
+                'pod_name': pod_name,
+                'message': message,
+                'message_id': message_id,
+                'start_time': self.test._get_malaysian_time().strftime('%Y/%m/%d %H:%M:%S'),
+                'details': f"Gossip propagation started for message: {message}"
+            })
+
+            with grpc.insecure_channel(target) as channel:
+                stub = gossip_pb2_grpc.GossipServiceStub(channel)
+                reply = stub.Initiate(gossip_pb2.InitiateRequest(message=message, message_id=message_id),
+                                      timeout=self.gossip_timeout)
+            coverage = self.tracker.wait(message_id, self.gossip_timeout, self.idle_timeout)
+            self.tracker.forget(message_id)
+
+            result = {
+                'event': 'gossip_end',
+                'pod_name': pod_name,
+                'message': message,
+                'message_id': message_id,
+                'end_time': self.test._get_malaysian_time().strftime('%Y/%m/%d %H:%M:%S'),
+                'ack_ms': reply.duration_ms,
+                'coverage': coverage['coverage'],
+                'duplicates': coverage['duplicates'],
+                'messages_sent': coverage['messages_sent'],
+                'message_overhead': coverage['message_overhead'],
+                # From the initiator accepting the request to the last event reported by any node
+                'completion_ms': (max(coverage['last_timestamp'], reply.completed_timestamp)
+                                  - reply.received_timestamp) / 1e6,
+                'details': f"Gossip propagation completed for message: {message} ({reply.details})"
+            }
+        except Exception as e:
+            result = {
+                'event': 'gossip_error',
+                'pod_name': pod_name,
+                'message': message,
+                'message_id': message_id,
+                'error': str(e),
+                'details': f"Error initiating gossip on pod {pod_name}: {e}"
+            }
+            traceback.print_exc()
+        self._log(result)
+        with self._lock:
+            self.results.append(result)
+
+    def _log(self, data):
+        # One line per record, even with many gossip threads printing at once
+        with self._lock:
+            print(json.dumps(data), flush=True)
@@ -0,0 +1,131 @@
+import grpc
+import threading
+from contextlib import contextmanager
+import gossip_pb2_grpc
+
+# Status codes meaning the connection itself is broken; other failures (e.g.
+# DEADLINE_EXCEEDED of a slow peer) leave the shared channel in place
+RECONNECT_CODES = (grpc.StatusCode.UNAVAILABLE,)
+
+
+class PooledChannel:
+    """
+    A pooled channel and the number of calls running on it. A retired channel
+    (replaced or evicted) is only closed once its last call is done, so the
+    other senders sharing it are not cancelled.
+    """
+
+    def __init__(self, channel, stub, callback=None):
+        self.channel = channel
+        self.stub = stub
+        self.callback = callback
+        self.calls = 0
+        self.retired = False
+
+    def acquire(self):
+        self.calls += 1
+        return self
+
+    def release(self):
+        """Returns True when the channel is retired and idle, i.e. it should be closed now."""
+        self.calls -= 1
+        return self.retired and self.calls == 0
+
+    def retire(self):
+        """Returns True when the channel is idle, i.e. it should be closed now."""
+        self.retired = True
+        return self.calls == 0
+
+
+class ChannelPool:
+    """
+    Keeps one warm gRPC channel (and stub) per peer IP so that repeated gossip
+    rounds reuse the same TCP/HTTP2 connection instead of paying a new
+    handshake on every hop.
+    """
+
+    # Connectivity states that mean the channel will not recover by itself
+    UNHEALTHY_STATES = (grpc.ChannelConnectivity.TRANSIENT_FAILURE,
+                        grpc.ChannelConnectivity.SHUTDOWN)
+
+    def __init__(self, port='5050'):
+        self.port = port
+        # peer_ip -> PooledChannel
+        self._entries = {}
+        # peer_ip -> last connectivity state reported by the channel
+        self._states = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stub(self, peer_ip):
+        """
+        Yields a stub for the peer, creating (or re-creating) the channel when it
+        is missing or reported unhealthy. The call must be made inside the block.
+        """
+        entry = self.acquire(peer_ip)
+        try:
+            yield entry.stub
+        finally:
+            self.release(entry)
+
+    def acquire(self, peer_ip):
+        """
+        Returns the PooledChannel of the peer with one more call registered, for
+        calls outliving a `with stub()` block (e.g. asynchronous ones); the
+        caller gives it back with release once the call is done.
+        """
+        with self._lock:
+            entry = self._entries.get(peer_ip)
+            if entry is None or self._states.get(peer_ip) in self.UNHEALTHY_STATES:
+                # Replace the broken channel (if any) before reconnecting
+                if entry is not None:
+                    self._retire(peer_ip, self._entries.pop(peer_ip))
+                entry = self._entries[peer_ip] = self._connect(peer_ip)
+            return entry.acquire()
+
+    def release(self, entry):
+        with self._lock:
+            close = entry.release()
+        if close:
+            entry.channel.close()
+
+    def report_error(self, peer_ip, error):
+        """Replaces the channel of a peer after a connection failure, so the next send reconnects."""
+        if error.code() in RECONNECT_CODES:
+            self.invalidate(peer_ip)
+
+    def invalidate(self, peer_ip):
+        """Replaces the channel of a peer; the old one is closed once its running calls are done."""
+        with self._lock:
+            entry = self._entries.pop(peer_ip, None)
+            if entry is not None:
+                self._retire(peer_ip, entry)
+
+    def retain(self, peer_ips):
+        """Evicts channels of peers that are no longer in the neighbor list."""
+        keep = set(peer_ips)
+        with self._lock:
+            for peer_ip in [ip for ip in self._entries if ip not in keep]:
+                self._retire(peer_ip, self._entries.pop(peer_ip))
+
+    def close(self):
+        """Closes every cached channel."""
+        self.retain(())
+
+    def _connect(self, peer_ip):
+        channel = grpc.insecure_channel(f"{peer_ip}:{self.port}")
+        callback = lambda state, ip=peer_ip: self._on_state_change(ip, state)
+        channel.subscribe(callback)
+        return PooledChannel(channel, gossip_pb2_grpc.GossipServiceStub(channel), callback)
+
+    def _on_state_change(self, peer_ip, state):
+        # Called from the gRPC polling thread; a plain dict write is enough here
+        self._states[peer_ip] = state
+
+    def _retire(self, peer_ip, entry):
+        # Unsubscribe first so the notifications of the old channel do not
+        # mark its replacement as unhealthy
+        entry.channel.unsubscribe(entry.callback)
+        self._states.pop(peer_ip, None)
+        if entry.retire():
+            entry.channel.close()
@@ -0,0 +1,390 @@
+import argparse
+import functools
+import json
+import math
+import re
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from event_logger import read_binary_event_stream
+from result_writer import ResultWriter, pa
+from seen_cache import SeenCache
+
+DEFAULT_COVERAGE_POINTS = [50, 90, 99, 100]
+# automate.py messages look like '4abf-cubaan50-1' (50 nodes, test 1)
+TOTAL_NODES_PATTERN = re.compile(r'cubaan(\d+)-')
+
+
+def metric_columns(coverage_points):
+    """Returns the output columns, with one time-to-coverage column per point (in %)."""
+    return (['message_id', 'message', 'initiator', 'start_timestamp', 'total_nodes', 'nodes_received', 'coverage'] +
+            [f'time_to_{point:g}_ms' for point in coverage_points] +
+            ['max_propagation_time', 'mean_propagation_time', 'duplicates', 'duplicate_ratio', 'messages_sent',
+             'message_overhead', 'last_event_ms'])
+
+
+def metric_schema(columns):
+    if pa is None:
+        return None
+    types = {'message_id': pa.string(), 'message': pa.string(), 'initiator': pa.string(),
+             'start_timestamp': pa.int64(), 'total_nodes': pa.int64(), 'nodes_received': pa.int64()}
+    return pa.schema([(column, types.get(column, pa.float64())) for column in columns])
+
+
+def iter_events(f, record_format='auto'):
+    """
+    Yields the gossip events of a binary stream: node stdout or an ndjson event
+    log (lines that are not events are skipped), or a binary event log.
+    """
+    if record_format == 'auto':
+        # Binary records start with a little-endian length, whose high bytes are zero
+        record_format = 'binary' if b'\x00' in f.peek(4)[:4] else 'ndjson'
+    if record_format == 'binary':
+        yield from read_binary_event_stream(f)
+        return
+    for line in f:
+        line = line.strip()
+        if not line.startswith(b'{'):
+            continue
+        try:
+            event_data = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event_data, dict) and 'event_type' in event_data:
+            yield event_data
+
+
+class GossipAggregator:
+    """
+    Joins node events by message and reduces every gossip to one row of
+    propagation metrics. Only small per-gossip state is kept (one arrival time
+    per node); rows are handed to the writer as soon as a gossip is finished,
+    so long campaigns are collected in bounded memory.
+    """
+
+    def __init__(self, writer, total_nodes=None, coverage_points=None, idle_timeout=10.0, message_filter=None):
+        """
+        Args:
+            writer: ResultWriter receiving the rows.
+            total_nodes: Number of nodes (default: read from the message, e.g. 'cubaan50').
+            coverage_points: Coverage percentages to report the time to.
+            idle_timeout: A gossip is finished after this many seconds without events (wall clock
+                when following, event time when reading finite sources).
+            message_filter: Only messages containing this string are collected.
+        """
+        self.writer = writer
+        self.total_nodes = total_nodes
+        self.coverage_points = coverage_points or DEFAULT_COVERAGE_POINTS
+        self.idle_timeout = idle_timeout
+        self.message_filter = message_filter
+        self.gossips = {}
+        self.events = 0
+        self.rows = 0
+        self.full_coverage = 0
+        # Gossips already written; their late events are dropped instead of starting a partial row
+        self.finished = SeenCache(max_entries=100000, ttl=3600.0)
+        # Finite sources (see open_sources) -> latest event timestamp read from it, None until started
+        self.watermarks = {}
+        self._lock = threading.Lock()
+
+    def open_sources(self, sources):
+        """Registers the finite sources (e.g. log files) whose reading progress flush_read uses."""
+        with self._lock:
+            self.watermarks.update((source, None) for source in sources)
+
+    def close_source(self, source):
+        """Marks a source as read to the end: it no longer holds back any gossip."""
+        with self._lock:
+            self.watermarks.pop(source, None)
+
+    def add_event(self, event_data, source=None):
+        message = event_data.get('message') or ''
+        timestamp = event_data['received_timestamp']
+        if source is not None:
+            with self._lock:
+                # Events of one source come in time order; its watermark tells how far it was read
+                self.watermarks[source] = max(self.watermarks.get(source) or timestamp, timestamp)
+        if self.message_filter and self.message_filter not in message:
+            return
+        message_id = event_data.get('message_id') or message
+        event_type = event_data.get('event_type')
+        with self._lock:
+            if message_id in self.finished:
+                return
+            self.events += 1
+            gossip = self.gossips.get(message_id)
+            if gossip is None:
+                gossip = self.gossips[message_id] = {
+                    'message': message, 'initiator': None, 'start': None, 'first': timestamp, 'last': timestamp,
+                    'arrivals': {}, 'duplicates': 0.0, 'propagation_sum': 0.0, 'propagation_max': 0.0,
+                    'propagation_count': 0, 'last_update': 0.0,
+                }
+            gossip['first'] = min(gossip['first'], timestamp)
+            gossip['last'] = max(gossip['last'], timestamp)
+            gossip['last_update'] = time.monotonic()
+            if event_type == 'duplicate':
+                # Sampled duplicates stand for 1 / sample_rate events
+                gossip['duplicates'] += 1.0 / event_data.get('sample_rate', 1.0)
+                return
+            receiver = event_data['receiver_id']
+            gossip['arrivals'][receiver] = min(gossip['arrivals'].get(receiver, timestamp), timestamp)
+            if event_type == 'initiate':
+                gossip['initiator'] = receiver
+                gossip['start'] = timestamp
+            elif event_data.get('propagation_time') is not None:
+                gossip['propagation_sum'] += event_data['propagation_time']
+                gossip['propagation_max'] = max(gossip['propagation_max'], event_data['propagation_time'])
+                gossip['propagation_count'] += 1
+
+    def add_lines(self, lines):
+        """Feeds ndjson text lines (e.g. pushed by a client)."""
+        for line in lines:
+            line = line.strip()
+            if line.startswith('{'):
+                try:
+                    self.add_event(json.loads(line))
+                except (ValueError, KeyError):
+                    pass
+
+    def flush_idle(self):
+        """Writes the gossips without events for idle_timeout seconds."""
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            done = [message_id for message_id, gossip in self.gossips.items() if gossip['last_update'] <= deadline]
+            rows = [self._finish(message_id) for message_id in done]
+        if rows:
+            self.writer.write(rows)
+
+    def flush_read(self):
+        """
+        Finite sources: writes the gossips every open source has been read past by
+        idle_timeout seconds (of event time), the follow-mode rule applied to the
+        reading progress, so rows come out while large log sets are still read.
+        """
+        with self._lock:
+            if any(watermark is None for watermark in self.watermarks.values()):
+                # A source not started yet may still hold events of any gossip
+                return
+            if self.watermarks:
+                deadline = min(self.watermarks.values()) - self.idle_timeout * 1e9
+                done = [message_id for message_id, gossip in self.gossips.items() if gossip['last'] <= deadline]
+            else:
+                done = list(self.gossips)
+            rows = [self._finish(message_id) for message_id in done]
+        if rows:
+            self.writer.write(rows)
+
+    def flush_all(self):
+        with self._lock:
+            rows = [self._finish(message_id) for message_id in list(self.gossips)]
+        if rows:
+            self.writer.write(rows)
+
+    def _finish(self, message_id):
+        gossip = self.gossips.pop(message_id)
+        self.finished.add(message_id)
+        total_nodes = self.total_nodes
+        if total_nodes is None:
+            match = TOTAL_NODES_PATTERN.search(gossip['message'])
+            total_nodes = int(match.group(1)) if match else None
+        # Without the initiator's event, the earliest event stands in for the start
+        start = gossip['start'] if gossip['start'] is not None else gossip['first']
+        arrivals = sorted(gossip['arrivals'].values())
+        received = gossip['propagation_count']
+        messages = received + gossip['duplicates']
+
+        row = {
+            'message_id': message_id,
+            'message': gossip['message'],
+            'initiator': gossip['initiator'],
+            'start_timestamp': start,
+            'total_nodes': total_nodes,
+            'nodes_received': len(arrivals),
+            'coverage': len(arrivals) / total_nodes if total_nodes else None,
+        }
+        for point in self.coverage_points:
+            needed = math.ceil(point / 100 * total_nodes) if total_nodes else None
+            row[f'time_to_{point:g}_ms'] = ((arrivals[needed - 1] - start) / 1e6
+                                            if needed and len(arrivals) >= needed else None)
+        row.update({
+            'max_propagation_time': gossip['propagation_max'] if received else None,
+            'mean_propagation_time': gossip['propagation_sum'] / received if received else None,
+            'duplicates': gossip['duplicates'],
+            'duplicate_ratio': gossip['duplicates'] / messages if messages else 0.0,
+            'messages_sent': messages,
+            # Messages sent per node reached (1.0 means no redundant message at all)
+            'message_overhead': messages / received if received else None,
+            'last_event_ms': (gossip['last'] - start) / 1e6,
+        })
+        self.rows += 1
+        if total_nodes and len(arrivals) >= total_nodes:
+            self.full_coverage += 1
+        return row
+
+
+def get_pods(label_selector):
+    stdout = subprocess.run(['kubectl', 'get', 'pods', '-l', label_selector, '-o',
+                             'jsonpath={.items[*].metadata.name}'], check=True, capture_output=True, text=True).stdout
+    return stdout.split()
+
+
+def pod_command(pod_name, follow, pod_log_file):
+    """kubectl command printing the events of a pod: its stdout, or its EVENT_LOG_FILE."""
+    if pod_log_file:
+        reader = ['tail', '-c', '+1', '-f', pod_log_file] if follow else ['cat', pod_log_file]
+        return ['kubectl', 'exec', pod_name, '--'] + reader
+    return ['kubectl', 'logs', pod_name] + (['-f'] if follow else [])
+
+
+class ProcessGroup:
+    """The kubectl processes of the collector, killed together on shutdown so their readers see EOF."""
+
+    def __init__(self):
+        self._processes = []
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def start(self, command):
+        """Starts a process reading into a pipe, or returns None once the group is stopped."""
+        with self._lock:
+            if self._stopped:
+                return None
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            self._processes.append(process)
+            return process
+
+    def kill(self):
+        with self._lock:
+            self._stopped = True
+            processes = list(self._processes)
+        for process in processes:
+            process.kill()
+
+
+def collect_command(aggregator, command, record_format, processes, source=None):
+    process = processes.start(command)
+    if process is None:
+        return
+    try:
+        for event_data in iter_events(process.stdout, record_format):
+            aggregator.add_event(event_data, source)
+    finally:
+        process.kill()
+        process.wait()
+        if source is not None:
+            aggregator.close_source(source)
+
+
+def collect_file(aggregator, path, record_format, source=None):
+    try:
+        with open(path, 'rb') as f:
+            for event_data in iter_events(f, record_format):
+                aggregator.add_event(event_data, source)
+    finally:
+        if source is not None:
+            aggregator.close_source(source)
+
+
+def make_push_handler(aggregator):
+    class PushHandler(BaseHTTPRequestHandler):
+        """Accepts ndjson events POSTed to any path."""
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            aggregator.add_lines(body.decode('utf-8').splitlines())
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return PushHandler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Collect gossip events and write per-gossip propagation metrics")
+    parser.add_argument('--files', nargs='*', default=[], help="Node log / event log files (ndjson or binary)")
+    parser.add_argument('--pods', action='store_true', help="Collect the events of all gossip pods with kubectl")
+    parser.add_argument('--label_selector', default='app=bcgossip', help="Gossip pod selector (default: app=bcgossip)")
+    parser.add_argument('--pod_log_file', default=None,
+                        help="Read this EVENT_LOG_FILE inside the pods instead of their stdout")
+    parser.add_argument('--follow', action='store_true', help="Keep streaming the pod logs until interrupted")
+    parser.add_argument('--listen', type=int, default=None, help="Also accept ndjson events POSTed to this port")
+    parser.add_argument('--format', default='auto', choices=['auto', 'ndjson', 'binary'],
+                        help="Event record format (default: auto)")
+    parser.add_argument('--total_nodes', type=int, default=None,
+                        help="Number of nodes (default: read from the message, e.g. 'cubaan50')")
+    parser.add_argument('--coverage_points', type=float, nargs='+', default=DEFAULT_COVERAGE_POINTS,
+                        help="Coverage percentages to report the time to (default: 50 90 99 100)")
+    parser.add_argument('--filter', default=None, help="Only collect messages containing this string (e.g. a test ID)")
+    parser.add_argument('--idle_timeout', type=float, default=10.0,
+                        help="A gossip is written after this many seconds without events (default: 10)")
+    parser.add_argument('--workers', type=int, default=32, help="Sources read at once without --follow (default: 32)")
+    parser.add_argument('--output', default='gossip_metrics.csv', help="CSV file, or Parquet directory ending in .parquet")
+    args = parser.parse_args()
+
+    columns = metric_columns(args.coverage_points)
+    writer = ResultWriter(args.output, columns, metric_schema(columns))
+    aggregator = GossipAggregator(writer, args.total_nodes, args.coverage_points, args.idle_timeout, args.filter)
+    start_time = time.time()
+
+    processes = ProcessGroup()
+    # Finite sources report their reading progress so that finished gossips are written while reading
+    tracked = not args.follow
+    jobs = [functools.partial(collect_file, aggregator, path, args.format, path if tracked else None)
+            for path in args.files]
+    if args.pods:
+        pods = get_pods(args.label_selector)
+        print(f"Collecting events from {len(pods)} pods", flush=True)
+        jobs += [functools.partial(collect_command, aggregator,
+                                   pod_command(pod_name, args.follow, args.pod_log_file), args.format, processes,
+                                   f'pod/{pod_name}' if tracked else None)
+                 for pod_name in pods]
+    if tracked:
+        aggregator.open_sources(job.args[-1] for job in jobs)
+
+    server = None
+    if args.listen is not None:
+        server = ThreadingHTTPServer(('', args.listen), make_push_handler(aggregator))
+        threading.Thread(target=server.serve_forever, name='collector-push', daemon=True).start()
+        print(f"Accepting pushed events on port {args.listen}", flush=True)
+
+    streaming = args.follow or server is not None
+    # A collector running in the background is stopped with SIGTERM; finish the open gossips first
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    # Followed streams never end, so each one needs its own thread
+    executor = ThreadPoolExecutor(max_workers=max(len(jobs) if args.follow else min(args.workers, len(jobs)), 1))
+    pending = [executor.submit(job) for job in jobs]
+    try:
+        if streaming:
+            while True:
+                time.sleep(1)
+                aggregator.flush_idle()
+        # Finite sources: write the gossips read to completion so far every second,
+        # so an interrupted run keeps every row it finished
+        while not wait(pending, timeout=1).done.issuperset(pending):
+            aggregator.flush_read()
+        for future in pending:
+            future.result()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.shutdown()
+        # The readers of followed logs only return once their kubectl process is gone
+        processes.kill()
+        executor.shutdown(wait=True, cancel_futures=True)
+        aggregator.flush_all()
+        writer.close()
+
+    print(json.dumps({
+        'event': 'collector_summary',
+        'gossips': aggregator.rows,
+        'full_coverage': aggregator.full_coverage,
+        'events': aggregator.events,
+        'output': args.output,
+        'duration_s': time.time() - start_time,
+    }), flush=True)
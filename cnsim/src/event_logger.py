@@ -0,0 +1,139 @@
+import json
+import math
+import queue
+import random
+import struct
+import sys
+import threading
+import time
+
+# Binary record layout (little endian):
+#   record length (uint32, excluding itself), received_timestamp (int64),
+#   propagation_time (float64, NaN when None), duplicate sample rate (float32),
+#   event type code (uint8),
+#   then message, message_id, sender_id, receiver_id and detail as
+#   uint16 length-prefixed utf-8 strings
+RECORD_HEADER = struct.Struct('<IqdfB')
+STRING_LENGTH = struct.Struct('<H')
+EVENT_TYPES = ['initiate', 'received', 'duplicate']
+STRING_FIELDS = ['message', 'message_id', 'sender_id', 'receiver_id', 'detail']
+
+
+def encode_binary_event(event_data):
+    """Encodes one event into a binary record."""
+    strings = b''
+    for field in STRING_FIELDS:
+        value = str(event_data.get(field) or '').encode('utf-8')[:0xFFFF]
+        strings += STRING_LENGTH.pack(len(value)) + value
+    propagation_time = event_data.get('propagation_time')
+    body_length = RECORD_HEADER.size - 4 + len(strings)
+    return RECORD_HEADER.pack(body_length, event_data['received_timestamp'],
+                              math.nan if propagation_time is None else propagation_time,
+                              event_data.get('sample_rate', 1.0),
+                              EVENT_TYPES.index(event_data['event_type'])) + strings
+
+
+def read_binary_events(path):
+    """Yields the events (as dictionaries) stored in a binary event log file."""
+    with open(path, 'rb') as f:
+        yield from read_binary_event_stream(f)
+
+
+def read_binary_event_stream(f):
+    """Yields the events stored in a binary stream (e.g. a pipe); a truncated last record is ignored."""
+    while True:
+        header = f.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return
+        body_length, received_timestamp, propagation_time, sample_rate, event_type = RECORD_HEADER.unpack(header)
+        strings = f.read(body_length - (RECORD_HEADER.size - 4))
+        if len(strings) < body_length - (RECORD_HEADER.size - 4):
+            return
+        event_data = {
+            'received_timestamp': received_timestamp,
+            'propagation_time': None if math.isnan(propagation_time) else propagation_time,
+            'event_type': EVENT_TYPES[event_type],
+        }
+        if sample_rate != 1.0:
+            event_data['sample_rate'] = round(sample_rate, 6)
+        position = 0
+        for field in STRING_FIELDS:
+            (length,) = STRING_LENGTH.unpack_from(strings, position)
+            position += STRING_LENGTH.size
+            event_data[field] = strings[position:position + length].decode('utf-8')
+            position += length
+        yield event_data
+
+
+class EventLogger:
+    """
+    Queue-backed structured event logger.
+
+    Handlers only enqueue the event dictionary; a background thread serialises
+    the queued events and writes them in batches, flushing once per batch
+    instead of once per event. Output is compact NDJSON (stdout or a file) or
+    binary records (file only). Duplicate events can be sampled to cut volume;
+    the sample rate is kept in each sampled record so counts can be scaled back.
+    """
+
+    def __init__(self, flush_interval=1.0, batch_size=1000, path=None, record_format='ndjson',
+                 duplicate_sample_rate=1.0):
+        if record_format not in ('ndjson', 'binary'):
+            raise ValueError(f"Unknown event log format: {record_format}")
+        if record_format == 'binary' and not path:
+            raise ValueError("Binary event logs need a file path")
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.record_format = record_format
+        self.duplicate_sample_rate = duplicate_sample_rate
+        if path:
+            self._output = open(path, 'ab' if record_format == 'binary' else 'a')
+        else:
+            self._output = sys.stdout
+        self._queue = queue.SimpleQueue()
+        self._closed = object()
+        self._thread = threading.Thread(target=self._run, name='event-logger', daemon=True)
+        self._thread.start()
+
+    def log(self, event_data):
+        """Queues an event; never blocks on I/O."""
+        if event_data['event_type'] == 'duplicate' and self.duplicate_sample_rate < 1.0:
+            if random.random() >= self.duplicate_sample_rate:
+                return
+            event_data['sample_rate'] = self.duplicate_sample_rate
+        self._queue.put(event_data)
+
+    def close(self):
+        """Writes out everything queued so far and stops the background thread."""
+        self._queue.put(self._closed)
+        self._thread.join()
+        if self._output is not sys.stdout:
+            self._output.close()
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                event_data = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                event_data = None
+            if event_data is self._closed:
+                self._write(batch)
+                return
+            if event_data is not None:
+                batch.append(event_data)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch):
+        if not batch:
+            return
+        if self.record_format == 'binary':
+            self._output.write(b''.join(encode_binary_event(event_data) for event_data in batch))
+        else:
+            self._output.write(''.join(json.dumps(event_data, separators=(',', ':')) + '\n'
+                                       for event_data in batch))
+        self._output.flush()
@@ -14,17 +14,31 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0cgossip.proto\x12\x06gossip\"Z\n\rGossipMessage\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x11\n\tsender_id\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12\x12\n\nlatency_ms\x18\x04 \x01(\x02\"!\n\x0e\x41\x63knowledgment\x12\x0f\n\x07\x64\x65tails\x18\x01 \x01(\t2M\n\rGossipService\x12<\n\x0bSendMessage\x12\x15.gossip.GossipMessage\x1a\x16.gossip.Acknowledgmentb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0cgossip.proto\x12\x06gossip\"\x8d\x01\n\rGossipMessage\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x11\n\tsender_id\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12\x12\n\nlatency_ms\x18\x04 \x01(\x02\x12\x12\n\nmessage_id\x18\x05 \x01(\t\x12\x0c\n\x04hops\x18\x06 \x01(\x05\x12\x0f\n\x07seen_by\x18\x07 \x01(\x0c\"!\n\x0e\x41\x63knowledgment\x12\x0f\n\x07\x64\x65tails\x18\x01 \x01(\t\" \n\tStreamAck\x12\x13\n\x0bmessage_ids\x18\x01 \x03(\t\"6\n\x0fInitiateRequest\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x12\n\nmessage_id\x18\x02 \x01(\t\"\x90\x01\n\rInitiateReply\x12\x0f\n\x07\x64\x65tails\x18\x01 \x01(\t\x12\x12\n\nmessage_id\x18\x02 \x01(\t\x12\x0c\n\x04node\x18\x03 \x01(\t\x12\x1a\n\x12received_timestamp\x18\x04 \x01(\x03\x12\x1b\n\x13\x63ompleted_timestamp\x18\x05 \x01(\x03\x12\x13\n\x0b\x64uration_ms\x18\x06 \x01(\x01\"4\n\rReloadRequest\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x11\n\tbroadcast\x18\x02 \x01(\x08\"\x85\x01\n\x0bReloadReply\x12\x0f\n\x07\x64\x65tails\x18\x01 \x01(\t\x12\x10\n\x08\x66ilename\x18\x02 \x01(\t\x12\x12\n\nneighbours\x18\x03 \x01(\x05\x12\x15\n\rpods_reloaded\x18\x04 \x01(\x05\x12\x13\n\x0bpods_failed\x18\x05 \x01(\x05\x12\x13\n\x0b\x64uration_ms\x18\x06 \x01(\x01\"0\n\x06\x44igest\x12\x11\n\tsender_id\x18\x01 \x01(\t\x12\x13\n\x0bmessage_ids\x18\x02 \x03(\t\"K\n\x0b\x44igestReply\x12\'\n\x08messages\x18\x01 \x03(\x0b\x32\x15.gossip.GossipMessage\x12\x13\n\x0bmissing_ids\x18\x02 \x03(\t2\xae\x02\n\rGossipService\x12<\n\x0bSendMessage\x12\x15.gossip.GossipMessage\x1a\x16.gossip.Acknowledgment\x12<\n\x0cGossipStream\x12\x15.gossip.GossipMessage\x1a\x11.gossip.StreamAck(\x01\x30\x01\x12:\n\x08Initiate\x12\x17.gossip.InitiateRequest\x1a\x15.gossip.InitiateReply\x12\x34\n\x06Reload\x12\x15.gossip.ReloadRequest\x1a\x13.gossip.ReloadReply\x12/\n\x08PushPull\x12\x0e.gossip.Digest\x1a\x13.gossip.DigestReplyb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'gossip_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
-  _globals['_GOSSIPMESSAGE']._serialized_start=24
-  _globals['_GOSSIPMESSAGE']._serialized_end=114
-  _globals['_ACKNOWLEDGMENT']._serialized_start=116
-  _globals['_ACKNOWLEDGMENT']._serialized_end=149
-  _globals['_GOSSIPSERVICE']._serialized_start=151
-  _globals['_GOSSIPSERVICE']._serialized_end=228
+  _globals['_GOSSIPMESSAGE']._serialized_start=25
+  _globals['_GOSSIPMESSAGE']._serialized_end=166
+  _globals['_ACKNOWLEDGMENT']._serialized_start=168
+  _globals['_ACKNOWLEDGMENT']._serialized_end=201
+  _globals['_STREAMACK']._serialized_start=203
+  _globals['_STREAMACK']._serialized_end=235
+  _globals['_INITIATEREQUEST']._serialized_start=237
+  _globals['_INITIATEREQUEST']._serialized_end=291
+  _globals['_INITIATEREPLY']._serialized_start=294
+  _globals['_INITIATEREPLY']._serialized_end=438
+  _globals['_RELOADREQUEST']._serialized_start=440
+  _globals['_RELOADREQUEST']._serialized_end=492
+  _globals['_RELOADREPLY']._serialized_start=495
+  _globals['_RELOADREPLY']._serialized_end=628
+  _globals['_DIGEST']._serialized_start=630
+  _globals['_DIGEST']._serialized_end=678
+  _globals['_DIGESTREPLY']._serialized_start=680
+  _globals['_DIGESTREPLY']._serialized_end=755
+  _globals['_GOSSIPSERVICE']._serialized_start=758
+  _globals['_GOSSIPSERVICE']._serialized_end=1060
 # @@protoc_insertion_point(module_scope)
@@ -19,6 +19,26 @@ class GossipServiceStub(object):
                 request_serializer=gossip__pb2.GossipMessage.SerializeToString,
                 response_deserializer=gossip__pb2.Acknowledgment.FromString,
                 )
+        self.GossipStream = channel.stream_stream(
+                '/gossip.GossipService/GossipStream',
+                request_serializer=gossip__pb2.GossipMessage.SerializeToString,
+                response_deserializer=gossip__pb2.StreamAck.FromString,
+                )
+        self.Initiate = channel.unary_unary(
+                '/gossip.GossipService/Initiate',
+                request_serializer=gossip__pb2.InitiateRequest.SerializeToString,
+                response_deserializer=gossip__pb2.InitiateReply.FromString,
+                )
+        self.Reload = channel.unary_unary(
+                '/gossip.GossipService/Reload',
+                request_serializer=gossip__pb2.ReloadRequest.SerializeToString,
+                response_deserializer=gossip__pb2.ReloadReply.FromString,
+                )
+        self.PushPull = channel.unary_unary(
+                '/gossip.GossipService/PushPull',
+                request_serializer=gossip__pb2.Digest.SerializeToString,
+                response_deserializer=gossip__pb2.DigestReply.FromString,
+                )
 
 
 class GossipServiceServicer(object):
@@ -30,6 +50,31 @@ class GossipServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GossipStream(self, request_iterator, context):
+        """Long-lived stream per neighbor pair: many gossip messages pipelined, each acknowledged on arrival
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Initiate(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Reload(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def PushPull(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_GossipServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -38,6 +83,26 @@ def add_GossipServiceServicer_to_server(servicer, server):
                     request_deserializer=gossip__pb2.GossipMessage.FromString,
                     response_serializer=gossip__pb2.Acknowledgment.SerializeToString,
             ),
+            'GossipStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.GossipStream,
+                    request_deserializer=gossip__pb2.GossipMessage.FromString,
+                    response_serializer=gossip__pb2.StreamAck.SerializeToString,
+            ),
+            'Initiate': grpc.unary_unary_rpc_method_handler(
+                    servicer.Initiate,
+                    request_deserializer=gossip__pb2.InitiateRequest.FromString,
+                    response_serializer=gossip__pb2.InitiateReply.SerializeToString,
+            ),
+            'Reload': grpc.unary_unary_rpc_method_handler(
+                    servicer.Reload,
+                    request_deserializer=gossip__pb2.ReloadRequest.FromString,
+                    response_serializer=gossip__pb2.ReloadReply.SerializeToString,
+            ),
+            'PushPull': grpc.unary_unary_rpc_method_handler(
+                    servicer.PushPull,
+                    request_deserializer=gossip__pb2.Digest.FromString,
+                    response_serializer=gossip__pb2.DigestReply.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'gossip.GossipService', rpc_method_handlers)
@@ -64,3 +129,71 @@ class GossipService(object):
             gossip__pb2.Acknowledgment.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GossipStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/gossip.GossipService/GossipStream',
+            gossip__pb2.GossipMessage.SerializeToString,
+            gossip__pb2.StreamAck.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Initiate(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/gossip.GossipService/Initiate',
+            gossip__pb2.InitiateRequest.SerializeToString,
+            gossip__pb2.InitiateReply.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Reload(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/gossip.GossipService/Reload',
+            gossip__pb2.ReloadRequest.SerializeToString,
+            gossip__pb2.ReloadReply.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def PushPull(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/gossip.GossipService/PushPull',
+            gossip__pb2.Digest.SerializeToString,
+            gossip__pb2.DigestReply.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
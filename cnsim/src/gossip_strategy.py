@@ -0,0 +1,90 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+
+STRATEGIES = ('flood', 'fanout', 'probabilistic')
+
+
+class ForwardingStrategy:
+    """
+    Picks the neighbors a node forwards a gossip message to, out of all its
+    neighbors except the sender. Shared by the nodes and the simulator so that
+    both trade traffic for latency the same way.
+
+    flood          every candidate (the original behaviour)
+    fanout         `fanout` candidates picked at random
+    probabilistic  each candidate independently with `probability`
+
+    With a hop limit (ttl > 0), a message that already travelled ttl hops is
+    not forwarded any further, whatever the strategy.
+    """
+
+    def __init__(self, name='flood', fanout=3, probability=0.5, ttl=0):
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown gossip strategy: {name}")
+        self.name = name
+        self.fanout = fanout
+        self.probability = probability
+        self.ttl = ttl
+
+    def select(self, targets, hops, rng=random):
+        """
+        Args:
+            targets: Candidate neighbors (any items), the sender already excluded.
+            hops: Hops the message travelled to reach this node (0 on the initiator).
+            rng: random.Random (or the random module) used for the draws.
+
+        Returns:
+            (selected targets, reason the others were skipped: 'ttl' or the strategy name).
+        """
+        if self.ttl and hops >= self.ttl:
+            return [], 'ttl'
+        if self.name == 'fanout' and len(targets) > self.fanout:
+            return rng.sample(targets, self.fanout), self.name
+        if self.name == 'probabilistic':
+            return [target for target in targets if rng.random() < self.probability], self.name
+        return list(targets), self.name
+
+
+class MessageStore:
+    """
+    Thread-safe store of the recent messages of a node (message_id -> (message,
+    hops)) for push-pull anti-entropy, with the same LRU and TTL eviction as
+    SeenCache.
+    """
+
+    def __init__(self, max_entries=10000, ttl=600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # message_id -> (message, hops, stored time in monotonic seconds)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, message_id, message, hops):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._entries[message_id] = (message, hops, now)
+            self._entries.move_to_end(message_id)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def message_ids(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return list(self._entries)
+
+    def get(self, message_id):
+        """Returns (message, hops), or None when the message is not stored."""
+        with self._lock:
+            entry = self._entries.get(message_id)
+        return entry[:2] if entry is not None else None
+
+    def _expire(self, now):
+        deadline = now - self.ttl
+        while self._entries:
+            _, (_, _, stored) = next(iter(self._entries.items()))
+            if stored > deadline:
+                break
+            self._entries.popitem(last=False)
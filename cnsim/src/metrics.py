@@ -0,0 +1,221 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Default histogram buckets (milliseconds); the emulated edge latencies are 1-100 ms
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+class _ShardedMetric:
+    """
+    Base of the metrics updated on the gossip hot path.
+
+    Every thread updates its own shard (a dictionary keyed by label values), so
+    an update is a dictionary lookup and an in-place add without any lock; the
+    only lock is taken once per thread, when its shard is registered. Scrapes
+    merge the shards, tolerating values that are a few updates behind.
+    """
+
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        # list() copies a dictionary without releasing the GIL, so no resize can interleave
+        return [list(shard.items()) for shard in shards]
+
+    def _labels(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter(_ShardedMetric):
+    kind = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return sum(dict(items).get(labelvalues, 0) for items in self._snapshots())
+
+    def collect(self):
+        totals = {}
+        for items in self._snapshots():
+            for key, value in items:
+                totals[key] = totals.get(key, 0) + value
+        return [f'{self.name}{self._labels(key)} {_number(value)}' for key, value in sorted(totals.items())]
+
+
+class Histogram(_ShardedMetric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS_MS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = list(buckets)
+
+    def observe(self, value, *labelvalues):
+        shard = self._shard()
+        # [count per bucket (+Inf last)..., sum]; bucket counts are made cumulative on scrape
+        state = shard.get(labelvalues)
+        if state is None:
+            state = shard[labelvalues] = [0] * (len(self.buckets) + 2)
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def collect(self):
+        totals = {}
+        for items in self._snapshots():
+            for key, state in items:
+                total = totals.setdefault(key, [0] * (len(self.buckets) + 2))
+                for i, value in enumerate(list(state)):
+                    total[i] += value
+        lines = []
+        for key, total in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], total[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{self._labels(key, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{self.name}_sum{self._labels(key)} {_number(total[-1])}')
+            lines.append(f'{self.name}_count{self._labels(key)} {cumulative}')
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time (e.g. a queue size), so it costs nothing in between."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, callback):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def collect(self):
+        return [f'{self.name} {_number(self.callback())}']
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS_MS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, callback):
+        return self._register(Gauge(name, help_text, callback))
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+
+class NodeMetrics:
+    """The metrics of a gossip node."""
+
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry()
+        self.rpcs_received = self.registry.counter(
+            'gossip_rpcs_received_total', 'Gossip messages received, by event type (initiate, received, duplicate)',
+            ['event_type'])
+        self.sends = self.registry.counter('gossip_sends_total', 'Gossip messages sent, by peer', ['peer'])
+        self.send_failures = self.registry.counter(
+            'gossip_send_failures_total', 'Gossip sends that failed, by peer and gRPC status', ['peer', 'code'])
+        self.sends_skipped = self.registry.counter(
+            'gossip_sends_skipped_total',
+            'Neighbors a message was not forwarded to, by reason (seen_by, fanout, probabilistic, ttl)', ['reason'])
+        self.push_pull = self.registry.counter(
+            'gossip_push_pull_total', 'Push-pull anti-entropy exchanges, by result (ok, failed)', ['result'])
+        self.push_pull_messages = self.registry.counter(
+            'gossip_push_pull_messages_total',
+            'Messages exchanged by push-pull anti-entropy, by direction (pulled, pushed)', ['direction'])
+        self.propagation_time = self.registry.histogram(
+            'gossip_propagation_time_ms', 'Per-hop propagation time of first deliveries (ms)')
+        self.latency_sleep = self.registry.histogram(
+            'gossip_latency_sleep_ms', 'Time actually spent emulating edge latency before a send (ms)')
+        self.send_duration = self.registry.histogram(
+            'gossip_send_duration_ms', 'Duration of the gossip RPC to a peer, acknowledgment included (ms)')
+        self.handler_duration = self.registry.histogram(
+            'gossip_handler_duration_ms', 'Time a SendMessage handler holds its server thread (ms)')
+        self.handlers_started = self.registry.counter('gossip_handlers_started_total',
+                                                      'SendMessage handlers started')
+        self.handlers_finished = self.registry.counter('gossip_handlers_finished_total',
+                                                       'SendMessage handlers finished')
+        self.registry.gauge('gossip_handlers_in_progress', 'SendMessage handlers currently running',
+                            lambda: self.handlers_started.value() - self.handlers_finished.value())
+
+    def watch_executor(self, name, executor, max_workers):
+        """Adds queue depth and saturation gauges of a ThreadPoolExecutor."""
+        # _work_queue holds the submitted calls no worker thread has picked up yet
+        self.registry.gauge(f'gossip_{name}_queue_depth', f'Calls waiting for a {name} thread',
+                            lambda: executor._work_queue.qsize())
+        self.registry.gauge(f'gossip_{name}_threads', f'Threads started by the {name} pool',
+                            lambda: len(executor._threads))
+        self.registry.gauge(f'gossip_{name}_max_threads', f'Size of the {name} pool', lambda: max_workers)
+
+
+def start_metrics_server(registry, port):
+    """Serves the registry on http://<host>:<port>/metrics from a daemon thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('', port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    print(f"Metrics available on port {port} (/metrics)", flush=True)
+    return server
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
@@ -1,18 +1,23 @@
 import networkx as nx
-import json
-from itertools import combinations
 import random
 import os
 from datetime import datetime
 import argparse
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from adjacency_index import index_path_for, write_adjacency_index
+from topology_binary import binary_path_for, save_topology_binary
+from topology_stream import COMPRESSION_SUFFIXES, write_topology_stream
 
 def set_network_latency(graph,min_latency=1,max_latency=100):
 
     # Registered network graph with its neighbor
     # and its weight (latency)
-    for u, v in combinations(graph, 2):
-        if graph.has_edge(u, v) and 'weight' not in graph.edges[u, v]:
-            graph.edges[u, v]['weight'] = random.randint(min_latency,max_latency)
+    # Visit the edges only (O(E)) instead of every node pair
+    for u, v, data in graph.edges(data=True):
+        if 'weight' not in data:
+            data['weight'] = random.randint(min_latency,max_latency)
 
     return graph
 
@@ -143,6 +148,109 @@ def construct_ER_network(number_of_nodes, probability_of_edges):
     else:
         return False
 
+def sample_gnp_edges(number_of_nodes, probability_of_edges, rng):
+    """
+    Samples the edges of a G(n, p) graph with geometric skips.
+
+    Instead of testing all n(n-1)/2 node pairs, the gaps between successive
+    selected pairs are drawn from a geometric distribution, so the work is
+    proportional to the number of edges.
+
+    Returns:
+        (sources, targets) int64 arrays, sources < targets.
+    """
+    total_pairs = number_of_nodes * (number_of_nodes - 1) // 2
+    if total_pairs == 0 or probability_of_edges <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if probability_of_edges >= 1:
+        targets, sources = np.tril_indices(number_of_nodes, -1)
+        return sources.astype(np.int64), targets.astype(np.int64)
+
+    # Draw the skips in chunks sized for the expected number of edges
+    expected_edges = total_pairs * probability_of_edges
+    chunk_size = int(expected_edges + 5 * np.sqrt(expected_edges)) + 16
+    chunks = []
+    last_pair = -1
+    while True:
+        pairs = last_pair + np.cumsum(rng.geometric(probability_of_edges, size=chunk_size))
+        pairs = pairs[pairs < total_pairs]
+        chunks.append(pairs)
+        if len(pairs) < chunk_size:
+            break
+        last_pair = pairs[-1]
+    pairs = np.concatenate(chunks)
+
+    # Pair index k = t(t-1)/2 + s for s < t; invert it (with a float rounding fix-up)
+    targets = ((1 + np.sqrt(1 + 8 * pairs.astype(np.float64))) // 2).astype(np.int64)
+    targets -= targets * (targets - 1) // 2 > pairs
+    targets += (targets + 1) * targets // 2 <= pairs
+    sources = pairs - targets * (targets - 1) // 2
+    return sources, targets
+
+def connect_components(number_of_nodes, sources, targets, rng):
+    """
+    Links the connected components of an edge list into one component, by
+    chaining a random node of each component to a random node of the next one
+    (the same repair construct_ER_network does, in one pass over the edges).
+
+    Returns:
+        (sources, targets) with the linking edges appended.
+    """
+    adjacency = sparse.coo_array((np.ones(len(sources), dtype=np.int8), (sources, targets)),
+                                 shape=(number_of_nodes, number_of_nodes))
+    num_components, labels = connected_components(adjacency, directed=False)
+    if num_components <= 1:
+        return sources, targets
+    print(f"Linking {num_components} components")
+
+    # A random representative per component: first node of each label in a random permutation
+    order = rng.permutation(number_of_nodes)
+    _, first = np.unique(labels[order], return_index=True)
+    representatives = order[first]
+    return (np.concatenate((sources, representatives[:-1])),
+            np.concatenate((targets, representatives[1:])))
+
+def construct_ER_network_fast(number_of_nodes, probability_of_edges, min_latency=0, max_latency=0, seed=None):
+    """
+    Scalable ER construction for large topologies: geometric-skip edge sampling,
+    a single connectivity repair pass and one vectorized latency draw. Unlike
+    construct_ER_network, the result is always connected, so no retry is needed.
+    """
+    rng = np.random.default_rng(seed)
+    print(f"Initial status from the input .....")
+    print(f"Number of nodes in the network: {number_of_nodes}")
+    print(f"Connection probability (degree): {probability_of_edges}")
+    print(f"Creating ERDOS RENYI (ER) network model (fast) .....")
+
+    sources, targets = sample_gnp_edges(number_of_nodes, probability_of_edges, rng)
+    sources, targets = connect_components(number_of_nodes, sources, targets, rng)
+    weights = rng.integers(min_latency, max_latency, size=len(sources), endpoint=True)
+
+    ER_graph = nx.Graph()
+    ER_graph.add_nodes_from(range(number_of_nodes))
+    ER_graph.add_weighted_edges_from(zip(sources.tolist(), targets.tolist(), weights.tolist()))
+    print(f"Graph: {ER_graph}")
+    print(f"avg_graph_degree_raw: {2 * ER_graph.number_of_edges() / number_of_nodes}")
+    return ER_graph
+
+def construct_BA_network_fast(number_of_nodes, parameter, min_latency=0, max_latency=0, seed=None):
+    """
+    Scalable BA construction: networkx preferential attachment (O(E), connected
+    by construction) followed by one vectorized latency draw.
+    """
+    rng = np.random.default_rng(seed)
+    print(f"Initial status from the input .....")
+    print(f"Number of nodes in the network: {number_of_nodes}")
+    print(f"Average neighbor (degree): {parameter}")
+    print(f"Creating BARABASI ALBERT (BA) network model (fast) .....")
+
+    network = nx.barabasi_albert_graph(number_of_nodes, parameter, seed=seed)
+    weights = rng.integers(min_latency, max_latency, size=network.number_of_edges(), endpoint=True)
+    for (u, v, data), weight in zip(network.edges(data=True), weights.tolist()):
+        data['weight'] = weight
+    print(f"Graph: {network}")
+    return network
+
 def iterate_and_print_graph(graph):
     """Iterates over the graph and prints its content in a structured format."""
 
@@ -178,13 +286,15 @@ def calculate_average_weight(graph):
     else:
         return 0  # Or handle the case where there are no edges with weights
 
-def save_topology_to_json(graph, others, type="BA"):
+def save_topology_to_json(graph, others, type="BA", binary=False, compression=None):
     """
     Saves the network topology to a JSON file.
 
     Args:
     graph: The NetworkX graph object.
     filename: (Optional) The name of the JSON file to save.
+    binary: (Optional) Also save the topology in the binary (.cnt) format.
+    compression: (Optional) Compress the JSON file with 'gzip' or 'zstd'.
     """
 
     # Get current date and time + second
@@ -196,23 +306,34 @@ def save_topology_to_json(graph, others, type="BA"):
     output_dir = "topology"
     os.makedirs(output_dir, exist_ok=True)
 
-    # prepare topology in json format
-    # Successfully installed networkx-3.4.2
-    # Use "edges" for forward compatibility
-    graph_data = nx.node_link_data(graph, edges="edges")
-    graph_data["weight_average"] = graph.average_weight
-    graph_data["total_edges"] = graph.total_edges
-    graph_data["total_nodes"] = graph.total_nodes
-    file_path = os.path.join(output_dir, filename)
-    with open(file_path, 'w') as f:
-        json.dump(graph_data, f, indent=4)
-    print(f"Topology saved to {filename}")
-
-def confirm_save(graph,others,model):
+    # Stream the node-link json one node / edge per line instead of building the
+    # whole document in memory; nodes can then filter their own edges line by line
+    file_path = write_topology_stream(os.path.join(output_dir, filename), graph.nodes,
+                                      graph.edges(data='weight'), compression)
+    print(f"Topology saved to {os.path.basename(file_path)}")
+
+    # Save CSR adjacency index so that each node can load only its own neighbors
+    index_path = index_path_for(file_path)
+    write_adjacency_index(index_path, list(graph.nodes),
+                          ((u, v, data.get('weight')) for u, v, data in graph.edges(data=True)))
+    print(f"Adjacency index saved to {os.path.basename(index_path)}")
+
+    # Save binary topology (memory-mapped by the nodes when FILENAME ends in .cnt)
+    if binary:
+        binary_path = binary_path_for(file_path)
+        position = {node: i for i, node in enumerate(graph.nodes)}
+        edges = list(graph.edges(data='weight', default=0))
+        save_topology_binary(binary_path, list(graph.nodes),
+                             [position[u] for u, _, _ in edges],
+                             [position[v] for _, v, _ in edges],
+                             [weight for _, _, weight in edges])
+        print(f"Binary topology saved to {os.path.basename(binary_path)}")
+
+def confirm_save(graph,others,model,binary=False,compression=None):
     save_graph = input("Do you want to save the graph? (y/n): ")
     if save_graph.lower() == 'y':
         # Save the topology to a JSON file
-        save_topology_to_json(graph, others, model)
+        save_topology_to_json(graph, others, model, binary, compression)
 
 def ensure_number(value):
     """
@@ -243,6 +364,10 @@ if __name__ == '__main__':
     parser.add_argument('--maxlat', default=0, help="Max latency of nodes for the topology (optional)")
     parser.add_argument('--adjust', default=0, help="Adjustment factor for the topology (optional)")
     parser.add_argument('--save', action='store_true', help="Save new topology to json(default: False) - (optional)")
+    parser.add_argument('--binary', action='store_true', help="Also save the topology in binary (.cnt) format (default: False) - (optional)")
+    parser.add_argument('--compress', default=None, choices=list(COMPRESSION_SUFFIXES), help="Compress the topology json with gzip or zstd (default: none) - (optional)")
+    parser.add_argument('--fast', action='store_true', help="Use the scalable generators for large topologies (default: False) - (optional)")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for the fast generators (optional)")
     args = parser.parse_args()
 
     # Getting minimum and maximum latency
@@ -267,17 +392,25 @@ if __name__ == '__main__':
             elif args.nodes > int(args.others):
                 # Using BA Model
                 parameter = int(args.others)
-                graph = construct_BA_network(number_of_nodes, parameter, adjust)
+                if args.fast:
+                    graph = construct_BA_network_fast(number_of_nodes, parameter, minlat, maxlat, args.seed)
+                else:
+                    graph = construct_BA_network(number_of_nodes, parameter, adjust)
         else:
             # print(f" float(args.others)={float(args.others)}")
-            if 0.01 >= float(args.others):
-                print(f" others={args.others} must be greater than 0.01 and less than 0.99 !")
+            # Large sparse topologies (--fast) need probabilities well below 0.01
+            min_probability = 0 if args.fast else 0.01
+            if min_probability >= float(args.others):
+                print(f" others={args.others} must be greater than {min_probability} and less than 0.99 !")
             elif float(args.others) >= 0.99:
                 print(f" others={args.others} must be greater than 0.01 and less than 0.99 !")
             else:
                 # Using ER Model
                 probability_of_edges = float(args.others) # 0.5
-                graph = construct_ER_network(number_of_nodes, probability_of_edges)
+                if args.fast:
+                    graph = construct_ER_network_fast(number_of_nodes, probability_of_edges, minlat, maxlat, args.seed)
+                else:
+                    graph = construct_ER_network(number_of_nodes, probability_of_edges)
     else:
         print(f" number_nodes={args.nodes} must be more than 0")
 
@@ -303,9 +436,9 @@ if __name__ == '__main__':
         print(f"{args.model} network model is SUCCESSFUL ! ....")
         print(f"Graph After: {network}")
         if args.model == 'BA':
-            confirm_save(network,parameter, args.model)
+            confirm_save(network,parameter, args.model, args.binary, args.compress)
         else:
-            confirm_save(network, probability_of_edges, args.model)
+            confirm_save(network, probability_of_edges, args.model, args.binary, args.compress)
 
     else:
         print(f"{args.model} network model is FAIL ! ....")
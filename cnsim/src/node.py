@@ -1,15 +1,35 @@
 
 import grpc
 import os
+import random
+import signal
 import socket
+import threading
 from concurrent import futures
 import gossip_pb2
 import gossip_pb2_grpc
+from channel_pool import ChannelPool
+from send_scheduler import DelayScheduler
+from stream_sender import StreamPool, message_key
+from seen_cache import SeenCache
+from gossip_strategy import ForwardingStrategy, MessageStore
+from seen_by import SeenBy
+from adjacency_index import index_path_for, read_node_names, read_node_neighbours
+from topology_binary import BINARY_SUFFIX, load_topology_binary, node_neighbours
+from topology_stream import is_topology_stream, open_topology, read_node_names_stream, read_node_neighbours_stream
+from pod_informer import PodInformer
+from event_logger import EventLogger
+from metrics import NodeMetrics, start_metrics_server
 import json
 import time
+import uuid
 from kubernetes import client, config
 
 
+class ReloadBroadcastError(Exception):
+    """This node reloaded its topology, but the other pods could not be enumerated."""
+
+
 class Node(gossip_pb2_grpc.GossipServiceServicer):
 
     def __init__(self, service_name):
@@ -21,14 +41,157 @@ class Node(gossip_pb2_grpc.GossipServiceServicer):
         self.service_name = service_name
         self.app_name = 'bcgossip'
         self.filename = os.environ['FILENAME']
-        # Get topology detail from json file
-        self.topology = self.get_topology('topology')
+        # Guards the topology while the Reload RPC swaps in another file
+        self.topology_lock = threading.RLock()
+        # Get topology detail: binary (.cnt), adjacency index (.adj) or json file
+        self.load_topology('topology')
         # List to keep track of IPs of neighboring nodes
         self.susceptible_nodes = []
+        # Neighbor IP resolution: 'api' (list pods through the Kubernetes API),
+        # 'dns' (headless service DNS names, no API traffic) or 'watch' (live
+        # pod name -> IP map kept by a Kubernetes watch)
+        self.neighbour_resolution = os.getenv('NEIGHBOUR_RESOLUTION', 'api')
+        # pod name -> IP resolved through DNS; unresolved names are retried and cached IPs
+        # re-resolved every DNS_REFRESH_INTERVAL seconds, and right after a neighbor was unreachable
+        self.dns_cache = {}
+        # Guards dns_cache: filled by gossip and the refresh thread, evicted by failed sends
+        self.dns_lock = threading.Lock()
+        self.dns_refresh_interval = float(os.getenv('DNS_REFRESH_INTERVAL', '30'))
+        self.dns_refresh = threading.Event()
         # Set to keep track of messages that have been received to prevent loops
-        self.received_message = ""
+        # (bounded by SEEN_CACHE_SIZE entries, each kept for SEEN_CACHE_TTL seconds)
+        self.received_messages = SeenCache(max_entries=int(os.getenv('SEEN_CACHE_SIZE', '10000')),
+                                           ttl=float(os.getenv('SEEN_CACHE_TTL', '600')))
+        # Warm gRPC channels to neighbors, reused across gossip rounds
+        self.channel_pool = ChannelPool(self.port)
+        # Fan-out mode: 'sequential' (one neighbor after another) or 'parallel'
+        self.fanout_mode = os.getenv('FANOUT_MODE', 'sequential')
+        # Max number of concurrent sends in parallel mode
+        self.max_in_flight = int(os.getenv('MAX_IN_FLIGHT', '32'))
+        # Transport: 'unary' (one SendMessage call per message, waiting for the acknowledgment)
+        # or 'stream' (messages pipelined over one GossipStream call per neighbor)
+        self.transport = os.getenv('TRANSPORT', 'unary')
+        self.stream_pool = None
+        if self.transport == 'stream':
+            self.stream_pool = StreamPool(self.channel_pool, on_failure=self._on_send_failure)
+        # Inbound GossipStream calls served at once (each holds a server thread for its whole
+        # lifetime); empty means this node's degree in the initial topology. Further streams
+        # are refused, so a Reload adding neighbors cannot starve the unary handlers
+        max_stream_peers = os.getenv('MAX_STREAM_PEERS', '')
+        self.max_stream_peers = 0
+        if self.transport == 'stream':
+            self.max_stream_peers = (int(max_stream_peers) if max_stream_peers
+                                     else len(self.get_topology_neighbours()))
+        self.inbound_streams = 0
+        self.inbound_streams_lock = threading.Lock()
+        # Acknowledgment: 'propagated' (SendMessage returns once this node's own fan-out
+        # is done) or 'immediate' (the fan-out is queued for the forwarding workers and
+        # the sender is acknowledged right away); GossipStream always queues
+        self.ack_mode = os.getenv('ACK_MODE', 'propagated')
+        # Forwarding queue served by FORWARD_WORKERS threads (only started when used)
+        self.forward_workers = int(os.getenv('FORWARD_WORKERS', '16'))
+        self.forward_executor = futures.ThreadPoolExecutor(max_workers=self.forward_workers,
+                                                           thread_name_prefix='forward')
+        # Forwarding strategy: 'flood' (every neighbor but the sender), 'fanout' (GOSSIP_FANOUT
+        # random neighbors) or 'probabilistic' (each neighbor with GOSSIP_PROBABILITY);
+        # with GOSSIP_TTL > 0, messages that travelled that many hops are not forwarded
+        self.strategy = ForwardingStrategy(os.getenv('GOSSIP_STRATEGY', 'flood'),
+                                           fanout=int(os.getenv('GOSSIP_FANOUT', '3')),
+                                           probability=float(os.getenv('GOSSIP_PROBABILITY', '0.5')),
+                                           ttl=int(os.getenv('GOSSIP_TTL', '0')))
+        # Seen-by summaries: 'off', or 'bitmap' / 'bloom' to piggyback the nodes known to have a
+        # message on it and skip those neighbors when forwarding
+        seen_by_mode = os.getenv('SEEN_BY', 'off')
+        self.seen_by = None
+        if seen_by_mode != 'off':
+            self.seen_by = SeenBy(seen_by_mode, bloom_bits=int(os.getenv('SEEN_BY_BLOOM_BITS', '512')))
+        # Nodes a forwarder marks: 'forwarders' (itself, on top of the forwarders that marked
+        # themselves upstream) or 'targets' (also the neighbors it is about to send to, before
+        # knowing whether those sends succeed)
+        self.seen_by_mark = os.getenv('SEEN_BY_MARK', 'forwarders')
+        # Push-pull anti-entropy: every PUSH_PULL_INTERVAL seconds, exchange the digest of the
+        # recent messages with a random neighbor (empty disables it)
+        push_pull_interval = os.getenv('PUSH_PULL_INTERVAL', '')
+        self.push_pull_interval = float(push_pull_interval) if push_pull_interval else None
+        self.message_store = None
+        if self.push_pull_interval:
+            self.message_store = MessageStore(max_entries=self.received_messages.max_entries,
+                                              ttl=self.received_messages.ttl)
+        # Per-peer RPC deadline in seconds (empty means no deadline)
+        peer_timeout = os.getenv('PEER_TIMEOUT', '')
+        self.peer_timeout = float(peer_timeout) if peer_timeout else None
+        self.fanout_executor = None
+        if self.fanout_mode == 'parallel':
+            self.fanout_executor = futures.ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                                              thread_name_prefix='fanout')
+        # Latency emulation: 'sleep' blocks before each send, 'scheduled' turns each
+        # edge latency into a dispatch time on a shared timer heap, whose thread only
+        # starts the (asynchronous) sends so that busy peers do not delay the others
+        self.latency_emulation = os.getenv('LATENCY_EMULATION', 'sleep')
+        self.send_scheduler = None
+        if self.latency_emulation == 'scheduled':
+            self.send_scheduler = DelayScheduler()
+        # Event logging: 'sync' prints each event, 'batched' queues events for a
+        # background writer (stdout or EVENT_LOG_FILE, ndjson or binary records)
+        self.event_logger = None
+        if os.getenv('EVENT_LOG_MODE', 'sync') == 'batched':
+            self.event_logger = EventLogger(flush_interval=float(os.getenv('EVENT_LOG_FLUSH_INTERVAL', '1.0')),
+                                            path=os.getenv('EVENT_LOG_FILE') or None,
+                                            record_format=os.getenv('EVENT_LOG_FORMAT', 'ndjson'),
+                                            duplicate_sample_rate=float(os.getenv('DUPLICATE_SAMPLE_RATE', '1.0')))
+        # Prometheus-style metrics served over HTTP on METRICS_PORT (disabled when empty)
+        metrics_port = os.getenv('METRICS_PORT', '')
+        self.metrics = None
+        if metrics_port:
+            self.metrics = NodeMetrics()
+            if self.fanout_executor is not None:
+                self.metrics.watch_executor('fanout', self.fanout_executor, self.max_in_flight)
+            self.metrics.watch_executor('forward', self.forward_executor, self.forward_workers)
+            if self.send_scheduler is not None:
+                self.metrics.registry.gauge('gossip_scheduled_sends', 'Sends waiting for their emulated latency',
+                                            lambda: len(self.send_scheduler))
+            start_metrics_server(self.metrics.registry, int(metrics_port))
+        # Started last: the refresh and watch threads may rebuild the neighbor list right away
+        if self.neighbour_resolution == 'dns':
+            threading.Thread(target=self._refresh_dns, name='dns-refresh', daemon=True).start()
+        self.pod_informer = None
+        if self.neighbour_resolution == 'watch':
+            # Topology neighbors never change; only their IPs are followed by the watch
+            self.topology_neighbours = self.get_topology_neighbours()
+            self.neighbour_names = {pod_name for pod_name, _ in self.topology_neighbours}
+            self.pod_informer = PodInformer("default", f"app={self.app_name}",
+                                            on_change=self._on_pod_change)
+            self.pod_informer.start()
         # self.gossip_initiated = False
 
+    def load_topology(self, topology_folder):
+        """
+        Loads the topology of this node from the cheapest available source:
+        a memory-mapped binary topology (FILENAME ending in .cnt), the adjacency
+        index stored alongside the json file, a streamed json file (filtered line
+        by line), or the json file itself.
+        """
+        self.topology_arrays = None
+        self.topology_index = None
+        self.topology_stream = None
+        self.topology = None
+        if self.filename.endswith(BINARY_SUFFIX):
+            topology_file_path = os.path.join(os.getcwd(), topology_folder, self.filename)
+            self.topology_arrays = load_topology_binary(topology_file_path)
+            print(f"Using binary topology: {topology_file_path}", flush=True)
+            return
+        # Adjacency index (<topology>.adj) lets the node read only its own neighbors
+        self.topology_index = self.get_topology_index(topology_folder)
+        if self.topology_index is not None:
+            return
+        # One record per line: only this node's edges get parsed, nothing is kept in memory
+        topology_file_path = os.path.join(os.getcwd(), topology_folder, self.filename)
+        if os.path.isfile(topology_file_path) and is_topology_stream(topology_file_path):
+            self.topology_stream = topology_file_path
+            print(f"Using streamed topology: {topology_file_path}", flush=True)
+            return
+        self.topology = self.get_topology(topology_folder)
+
     def get_topology(self,topology_folder):
         """
         Reads and returns the content of a specific JSON file from the topology directory.
@@ -46,7 +209,7 @@ class Node(gossip_pb2_grpc.GossipServiceServicer):
 
         if os.path.exists(topology_file_path) and os.path.isfile(topology_file_path):
             try:
-                with open(topology_file_path, 'r') as f:
+                with open_topology(topology_file_path) as f:
                     return json.load(f)
             except json.JSONDecodeError:
                 print(f"Error decoding JSON from file: {topology_file_path}")
@@ -55,7 +218,131 @@ class Node(gossip_pb2_grpc.GossipServiceServicer):
             print(f"Topology file not found: {topology_file_path}")
             return None
 
+    def get_topology_index(self, topology_folder):
+        """
+        Returns the path of the adjacency index stored alongside the topology file,
+        or None if there is no index (or the latency attribute is not the indexed 'weight').
+        """
+        topology_file_path = os.path.join(os.getcwd(), topology_folder, self.filename)
+        index_path = index_path_for(topology_file_path)
+        if os.getenv('LATENCY_OPTION', 'weight') == 'weight' and os.path.isfile(index_path):
+            print(f"Using adjacency index: {index_path}", flush=True)
+            return index_path
+        return None
+
+    def get_topology_neighbours(self):
+        """
+        Returns the (name, latency) pairs of the nodes sharing an edge with this node
+        in the topology.
+        """
+        with self.topology_lock:
+            return self._read_topology_neighbours()
+
+    def _read_topology_neighbours(self):
+        # Vectorized scan of the memory-mapped edge arrays
+        if self.topology_arrays is not None:
+            return node_neighbours(self.topology_arrays, self.hostname)
+
+        # O(degree) read of this node's slice of the adjacency index
+        if self.topology_index:
+            return read_node_neighbours(self.topology_index, self.hostname) or []
+
+        latency_option = os.getenv('LATENCY_OPTION', 'weight')  # Default to 'weight'
+        if self.topology_stream:
+            return read_node_neighbours_stream(self.topology_stream, self.hostname, latency_option)
+
+        neighbours = []
+        for edge in self.topology['edges']:
+            if edge['source'] == self.hostname:
+                neighbours.append((edge['target'], edge.get(latency_option)))
+            elif edge['target'] == self.hostname:
+                neighbours.append((edge['source'], edge.get(latency_option)))
+        return neighbours
+
+    def reload_topology(self, filename):
+        """
+        Switches this node to another topology file (with the same node names) and
+        rebuilds its neighbor list. Gossip already in flight keeps the neighbor list
+        it started with; new rounds see the new topology only once it is complete.
+        """
+        topology_file_path = os.path.join(os.getcwd(), 'topology', filename)
+        if not os.path.isfile(topology_file_path):
+            raise FileNotFoundError(f"Topology file not found: {topology_file_path}")
+
+        with self.topology_lock:
+            self.filename = filename
+            self.load_topology('topology')
+            if self.neighbour_resolution == 'watch':
+                self.topology_neighbours = self.get_topology_neighbours()
+                self.neighbour_names = {pod_name for pod_name, _ in self.topology_neighbours}
+            # Never keep neighbors of the previous topology, even if the refresh below fails
+            # (an empty list is refreshed again by the next gossip round)
+            self.susceptible_nodes = []
+            try:
+                self.get_neighbours()
+            except (config.ConfigException, client.ApiException) as e:
+                print(f"Neighbor refresh after reload failed: {e}", flush=True)
+        print(f"Topology reloaded: {filename} ({len(self.susceptible_nodes)} neighbors)", flush=True)
+
+    def get_topology_node_names(self):
+        """Returns the names of every node of the topology."""
+        with self.topology_lock:
+            if self.topology_arrays is not None:
+                return [name.decode('utf-8') for name in self.topology_arrays.names]
+            if self.topology_index:
+                return read_node_names(self.topology_index)
+            if self.topology_stream:
+                return read_node_names_stream(self.topology_stream)
+            return [node['id'] for node in self.topology['nodes']] if self.topology else []
+
+    def get_pod_ips(self):
+        """Returns the IPs of all other gossip pods."""
+        if self.pod_informer is not None:
+            pod_ips = list(self.pod_informer.pod_ips.values())
+        elif self.neighbour_resolution == 'dns':
+            # No API call: resolve the DNS name of every topology node (unresolved ones are skipped)
+            pod_names = [pod_name for pod_name in self.get_topology_node_names() if pod_name != self.hostname]
+            with futures.ThreadPoolExecutor(max_workers=min(32, max(len(pod_names), 1))) as executor:
+                pod_ips = [pod_ip for pod_ip in executor.map(self._resolve_pod_ip, pod_names) if pod_ip]
+        else:
+            config.load_incluster_config()
+            v1 = client.CoreV1Api()
+            ret = v1.list_namespaced_pod(namespace="default", label_selector=f"app={self.app_name}")
+            pod_ips = [pod.status.pod_ip for pod in ret.items if pod.status.pod_ip]
+        return [pod_ip for pod_ip in pod_ips if pod_ip != self.host]
+
+    def _broadcast_reload(self, filename):
+        """Asks every other gossip pod to reload; returns the number of pods that did and did not."""
+        request = gossip_pb2.ReloadRequest(filename=filename)
+
+        def reload_peer(peer_ip):
+            try:
+                with self.channel_pool.stub(peer_ip) as stub:
+                    stub.Reload(request, timeout=60)
+                return True
+            except grpc.RpcError as e:
+                self.channel_pool.report_error(peer_ip, e)
+                print(f"Reload of {peer_ip} failed: {e.code()} {e.details()}", flush=True)
+                return False
+
+        pod_ips = self.get_pod_ips()
+        with futures.ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            reloaded = sum(executor.map(reload_peer, pod_ips))
+        # Only neighbors keep pooled channels
+        self._retain_peers()
+        return reloaded, len(pod_ips) - reloaded
+
     def get_neighbours(self):
+        # Headless-service DNS resolution does not need the Kubernetes API at all
+        if self.neighbour_resolution == 'dns':
+            self.get_neighbours_from_dns()
+            return
+
+        # The watch keeps the pod map current; only wait for its first list
+        if self.neighbour_resolution == 'watch':
+            self.pod_informer.synced.wait(timeout=60)
+            self.get_neighbours_from_informer()
+            return
 
         # Load in-cluster config (for running inside Kubernetes)
         config.load_incluster_config()
@@ -72,36 +359,18 @@ class Node(gossip_pb2_grpc.GossipServiceServicer):
             # Fetch Pods in the specified namespace with the label selector
             ret = v1.list_namespaced_pod(namespace=namespace, label_selector=label_selector)
 
-            # temporary of all nodes (name, ip) except own IP addr
-            all_pods = [(pod.metadata.name, pod.status.pod_ip) for pod in ret.items if self.host != pod.status.pod_ip]
+            # temporary of all nodes (name -> ip) except own IP addr
+            all_pods = {pod.metadata.name: pod.status.pod_ip for pod in ret.items if self.host != pod.status.pod_ip}
 
             # Second, pick only neighbors that have edge with current pod/nodes
             # This step will refer to json network topology the we've obtained using
             # get_topology function previously
+            self.susceptible_nodes = [(pod_name, all_pods[pod_name], neighbor_latency)
+                                      for pod_name, neighbor_latency in self.get_topology_neighbours()
+                                      if pod_name in all_pods]
 
-            latency_option = os.getenv('LATENCY_OPTION', 'weight')  # Default to 'weight'
-
-            # Clear the existing list to refresh it
-            self.susceptible_nodes = []
-
-            # get neighbor pod's name and IPs from the all_pods list
-            for edge in self.topology['edges']:
-                neighbor_name = None
-                neighbor_ip = None
-                neighbor_latency = None
-
-                if edge['source'] == self.hostname:
-                    neighbor_name = edge['target']
-                    neighbor_latency = edge.get(latency_option)
-                elif edge['target'] == self.hostname:
-                    neighbor_name = edge['source']
-                    neighbor_latency = edge.get(latency_option)
-
-                if neighbor_name:
-                    for pod_name, pod_ip in all_pods:
-                        if pod_name == neighbor_name:
-                            self.susceptible_nodes.append((pod_name, pod_ip, neighbor_latency))
-                            break
+            # Drop pooled channels of peers that are no longer neighbors
+            self._retain_peers()
 
             # Optional: Log the list of neighbors for debugging
             # print(f"Susceptible nodes: {self.susceptible_nodes}", flush=True)
@@ -109,77 +378,480 @@ class Node(gossip_pb2_grpc.GossipServiceServicer):
         except client.ApiException as e:
             print(f"Failed to fetch Pods: {e}", flush=True)
 
+    def get_neighbours_from_dns(self, refresh=False):
+        """
+        Resolves neighbor IPs from the stable StatefulSet DNS names (<pod>.<service>)
+        of the headless service. Lookups run in parallel and resolved IPs are cached,
+        so no Kubernetes API call is made. With refresh, cached names are resolved
+        again too (a restarted pod gets a new IP).
+        """
+        neighbours = self.get_topology_neighbours()
+
+        with self.dns_lock:
+            pending = [pod_name for pod_name, _ in neighbours if refresh or pod_name not in self.dns_cache]
+        if pending:
+            # The lookups run without the lock, so failed sends can evict entries meanwhile
+            with futures.ThreadPoolExecutor(max_workers=min(32, len(pending))) as executor:
+                resolved = list(zip(pending, executor.map(self._resolve_pod_ip, pending)))
+            with self.dns_lock:
+                for pod_name, pod_ip in resolved:
+                    # A failed lookup keeps the cached IP (if any); unreachable peers are evicted on send
+                    if pod_ip is not None:
+                        self.dns_cache[pod_name] = pod_ip
+
+        susceptible_nodes = []
+        with self.dns_lock:
+            for pod_name, neighbor_latency in neighbours:
+                pod_ip = self.dns_cache.get(pod_name)
+                if pod_ip is not None:
+                    susceptible_nodes.append((pod_name, pod_ip, neighbor_latency))
+        self.susceptible_nodes = susceptible_nodes
+
+        # Drop pooled channels of peers that are no longer neighbors
+        self._retain_peers()
+
+    def get_neighbours_from_informer(self):
+        """Rebuilds the neighbor list from the live pod map of the watch (dictionary reads only)."""
+        pod_ips = self.pod_informer.pod_ips
+        neighbours = []
+        for pod_name, neighbor_latency in self.topology_neighbours:
+            pod_ip = pod_ips.get(pod_name)
+            if pod_ip and pod_ip != self.host:
+                neighbours.append((pod_name, pod_ip, neighbor_latency))
+        # Swap in the new list in one assignment; senders iterate over a consistent snapshot
+        self.susceptible_nodes = neighbours
+
+        # Drop pooled channels of peers that are no longer neighbors (or changed IP)
+        self._retain_peers()
+
+    def _refresh_dns(self):
+        """DNS mode: re-resolves the neighbors periodically, and as soon as one was found unreachable."""
+        while True:
+            self.dns_refresh.wait(self.dns_refresh_interval)
+            self.dns_refresh.clear()
+            try:
+                self.get_neighbours_from_dns(refresh=True)
+            except Exception as e:
+                print(f"DNS refresh failed: {e!r}", flush=True)
+
+    def _forget_unreachable(self, peer_ip, error):
+        # DNS mode: an unreachable neighbor may have been restarted with another IP
+        if self.neighbour_resolution != 'dns' or error.code() != grpc.StatusCode.UNAVAILABLE:
+            return
+        with self.dns_lock:
+            for pod_name in [name for name, ip in self.dns_cache.items() if ip == peer_ip]:
+                del self.dns_cache[pod_name]
+        self.dns_refresh.set()
+
+    def _retain_peers(self):
+        """Drops the pooled channels (and streams) of peers that are no longer neighbors."""
+        peer_ips = [peer_ip for _, peer_ip, _ in self.susceptible_nodes]
+        if self.stream_pool is not None:
+            self.stream_pool.retain(peer_ips)
+        self.channel_pool.retain(peer_ips)
+
+    def _on_pod_change(self, pod_name):
+        # Called from the watch thread when a pod gets a new IP or disappears
+        if pod_name in self.neighbour_names:
+            self.get_neighbours_from_informer()
+
+    def _resolve_pod_ip(self, pod_name):
+        try:
+            return socket.gethostbyname(f"{pod_name}.{self.service_name}")
+        except socket.gaierror as e:
+            # Not resolvable yet (pod still starting); retried by the next DNS refresh
+            print(f"Failed to resolve {pod_name}.{self.service_name}: {e}", flush=True)
+            return None
+
     def SendMessage(self, request, context):
 
         """
         Receiving message from other nodes
         and distribute it to others (multi rounds gossip)
         """
+        return self._handle_message(request, context, self.ack_mode == 'immediate')
+
+    def _handle_message(self, request, context, queue_forwarding):
+        if self.metrics is None:
+            return self._receive_message(request, context, queue_forwarding)
+        self.metrics.handlers_started.inc()
+        start = time.perf_counter()
+        try:
+            return self._receive_message(request, context, queue_forwarding)
+        finally:
+            self.metrics.handler_duration.observe((time.perf_counter() - start) * 1000)
+            self.metrics.handlers_finished.inc()
+
+    def _receive_message(self, request, context, queue_forwarding=False):
         message = request.message
         sender_id = request.sender_id
+        # Older senders do not set message_id; fall back to the message text
+        message_id = request.message_id or message
         received_timestamp = time.time_ns()
 
+        # Record the message and learn whether it was already received (atomic check-and-add)
+        is_new = self.received_messages.add(message_id)
+
         # For initiating acknowledgment only
         if sender_id == self.host:
-            self.received_message = message
             log_message = (f"Gossip initiated by {self.hostname} ({self.host}) at "
                            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(received_timestamp / 1e9))}")
             self._log_event(message, sender_id, received_timestamp, None,
-                            'initiate', log_message)
-            self.gossip_message(message, sender_id)
+                            'initiate', log_message, message_id)
+            self._store_message(message_id, message, request.hops)
+            self.gossip_message(message, sender_id, message_id, request.hops)
             return gossip_pb2.Acknowledgment(details=f"Done propagate! {self.host} received: '{message}'")
 
         # Check whether the message is already received or no
         # Notify whether accept it or ignore it
-        elif self.received_message == message:
+        elif not is_new:
             log_message = f"{self.host} ignoring duplicate message: {message} from {sender_id}"
-            self._log_event(message, sender_id, received_timestamp, None, 'duplicate', log_message)
+            self._log_event(message, sender_id, received_timestamp, None, 'duplicate', log_message, message_id)
             return gossip_pb2.Acknowledgment(details=f"Duplicate message ignored by ({self.host})")
         # Distribute gossip
-        # Once received, update message and distribute to connected neighbors
+        # Once received, distribute to connected neighbors
         else:
-            self.received_message = message
             propagation_time = (received_timestamp - request.timestamp) / 1e6
             log_message = (f"({self.hostname}({self.host}) received: '{message}' from {sender_id}"
                            f" in {propagation_time:.2f} ms ")
-            self._log_event(message, sender_id, received_timestamp, propagation_time, 'received', log_message)
-            self.gossip_message(message, sender_id) # key distribution
+            self._log_event(message, sender_id, received_timestamp, propagation_time, 'received', log_message,
+                            message_id)
+            self._store_message(message_id, message, request.hops)
+            if queue_forwarding:
+                # Acknowledge now; a forwarding worker distributes the message
+                self.forward_executor.submit(self.gossip_message, message, sender_id, message_id, request.hops,
+                                             request.seen_by).add_done_callback(self._check_forwarding)
+            else:
+                self.gossip_message(message, sender_id, message_id, request.hops, request.seen_by) # key distribution
             return gossip_pb2.Acknowledgment(details=f"{self.host} received: '{message}'")
 
-    def gossip_message(self, message, sender_ip):
+    def _store_message(self, message_id, message, hops):
+        # Kept for push-pull anti-entropy only
+        if self.message_store is not None:
+            self.message_store.add(message_id, message, hops)
+
+    def _check_forwarding(self, future):
+        if future.exception() is not None:
+            print(f"Forwarding failed: {future.exception()!r}", flush=True)
+
+    def GossipStream(self, request_iterator, context):
+        """
+        Receives the gossip messages a neighbor pipelines over one long-lived
+        stream. Each message is checked and logged on arrival, its fan-out is
+        queued for the forwarding workers and it is acknowledged right away,
+        so the sender never waits for the downstream propagation.
+        """
+        with self.inbound_streams_lock:
+            accepted = self.inbound_streams < self.max_stream_peers
+            if accepted:
+                self.inbound_streams += 1
+        if not accepted:
+            # The sender retries on a new stream after its reconnect delay
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                          f"{self.host} serves at most {self.max_stream_peers} gossip streams")
+        try:
+            for request in request_iterator:
+                self._handle_message(request, context, True)
+                yield gossip_pb2.StreamAck(message_ids=[message_key(request)])
+        finally:
+            with self.inbound_streams_lock:
+                self.inbound_streams -= 1
+
+    def PushPull(self, request, context):
+        """
+        Anti-entropy exchange: replies with the recent messages missing from the
+        requester's digest and the digest entries this node has not received.
+        """
+        return self._digest_reply(request)
+
+    def _digest_reply(self, request):
+        digest = set(request.message_ids)
+        messages = []
+        if self.message_store is not None:
+            for message_id in self.message_store.message_ids():
+                entry = self.message_store.get(message_id)
+                if message_id in digest or entry is None:
+                    continue
+                # The requester stamps the send time and latency of its exchange
+                messages.append(gossip_pb2.GossipMessage(message=entry[0], message_id=message_id,
+                                                         sender_id=self.host, hops=entry[1] + 1))
+        missing_ids = [message_id for message_id in request.message_ids if message_id not in self.received_messages]
+        return gossip_pb2.DigestReply(messages=messages, missing_ids=missing_ids)
+
+    def _run_push_pull(self):
+        """Anti-entropy loop: one digest exchange with a random neighbor every PUSH_PULL_INTERVAL seconds."""
+        while True:
+            time.sleep(self.push_pull_interval)
+            try:
+                self.push_pull()
+            except Exception as e:
+                print(f"Push-pull failed: {e!r}", flush=True)
+
+    def push_pull(self):
+        """
+        Exchanges the digest of the recent messages with a random neighbor: the
+        messages it has and this node misses are received as usual (pull), the
+        ones it misses are sent to it (push).
+        """
+        if len(self.susceptible_nodes) == 0:
+            self.get_neighbours()
+        if len(self.susceptible_nodes) == 0:
+            return
+        _, peer_ip, neighbor_latency = random.choice(self.susceptible_nodes)
+        send_timestamp = time.time_ns()
+        # The digest travels over the emulated edge like any gossip message
+        time.sleep(float(neighbor_latency) / 1000)
+        digest = gossip_pb2.Digest(sender_id=self.host, message_ids=self.message_store.message_ids())
+        try:
+            with self.channel_pool.stub(peer_ip) as stub:
+                reply = stub.PushPull(digest, timeout=self.peer_timeout)
+        except grpc.RpcError as e:
+            self.channel_pool.report_error(peer_ip, e)
+            self._forget_unreachable(peer_ip, e)
+            print(f"Push-pull with {peer_ip} failed: {e.code()} {e.details()}", flush=True)
+            self._count_push_pull('failed')
+            return
+        self._count_push_pull('ok', len(reply.messages), len(reply.missing_ids))
+        for request in reply.messages:
+            request.timestamp = send_timestamp
+            request.latency_ms = float(neighbor_latency)
+            self._handle_message(request, None, True)
+        for message_id in reply.missing_ids:
+            entry = self.message_store.get(message_id)
+            if entry is not None:
+                self._gossip_to_peer(entry[0], message_id, peer_ip, neighbor_latency, entry[1] + 1)
+
+    def _count_push_pull(self, result, pulled=0, pushed=0):
+        if self.metrics is not None:
+            self.metrics.push_pull.inc(result)
+            self.metrics.push_pull_messages.inc('pulled', amount=pulled)
+            self.metrics.push_pull_messages.inc('pushed', amount=pushed)
+
+    def Initiate(self, request, context):
+        """
+        Control RPC: starts a gossip on this node, as start.py does from inside
+        the pod, and returns the acknowledgment with its timing.
+        """
+        received_timestamp = time.time_ns()
+        message_id = request.message_id or uuid.uuid4().hex
+        ack = self.SendMessage(gossip_pb2.GossipMessage(
+            message=request.message,
+            message_id=message_id,
+            sender_id=self.host,
+            timestamp=received_timestamp,
+            latency_ms=0.0
+        ), context)
+        return self._initiate_reply(ack, message_id, received_timestamp)
+
+    def Reload(self, request, context):
+        """
+        Control RPC: switches this node to another topology file and, with
+        broadcast, every other gossip pod too, so that one deployment can run
+        many topologies without a Helm reinstall.
+        """
+        try:
+            return self._reload(request)
+        except FileNotFoundError as e:
+            context.abort(grpc.StatusCode.NOT_FOUND, str(e))
+        except ReloadBroadcastError as e:
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+
+    def _reload(self, request):
+        start_timestamp = time.time_ns()
+        self.reload_topology(request.filename)
+        reloaded = failed = 0
+        if request.broadcast:
+            try:
+                reloaded, failed = self._broadcast_reload(request.filename)
+            except (config.ConfigException, client.ApiException) as e:
+                raise ReloadBroadcastError(f"{self.host} reloaded topology {request.filename}, but the other pods "
+                                           f"could not be listed for the broadcast: {e}") from e
+        return gossip_pb2.ReloadReply(
+            details=f"{self.host} reloaded topology {request.filename}",
+            filename=request.filename,
+            neighbours=len(self.susceptible_nodes),
+            pods_reloaded=reloaded,
+            pods_failed=failed,
+            duration_ms=(time.time_ns() - start_timestamp) / 1e6
+        )
+
+    def _initiate_reply(self, ack, message_id, received_timestamp):
+        completed_timestamp = time.time_ns()
+        return gossip_pb2.InitiateReply(
+            details=ack.details,
+            message_id=message_id,
+            node=self.hostname,
+            received_timestamp=received_timestamp,
+            completed_timestamp=completed_timestamp,
+            duration_ms=(completed_timestamp - received_timestamp) / 1e6
+        )
+
+    def gossip_message(self, message, sender_ip, message_id='', hops=0, seen_by=b''):
         # Refresh list of neighbors before gossiping to capture any changes
         if len(self.susceptible_nodes) == 0:
             self.get_neighbours()
             print(f"self.susceptible_nodes: {self.susceptible_nodes}", flush=True)
 
-        # Send message to all peers
-        for peer_name, peer_ip, neighbor_latency in self.susceptible_nodes:
-            # Exclude the sender from the list of nodes to forward the message to
-            if peer_ip != sender_ip:
-
-                # Record the send timestamp
-                send_timestamp = time.time_ns()
-
-                # Simulate latency
-                time.sleep(float(neighbor_latency) / 1000)
-
-                with grpc.insecure_channel(f"{peer_ip}:5050") as channel:
-                # with grpc.insecure_channel(f"{peer_name}:5050") as channel:
-                    try:
-                        stub = gossip_pb2_grpc.GossipServiceStub(channel)
-                        stub.SendMessage(gossip_pb2.GossipMessage(
-                            message=message,
-                            sender_id=self.host,
-                            timestamp=send_timestamp,
-                            latency_ms=neighbor_latency  # Include latency in the gRPC message
-                        ))
-                    except grpc.RpcError as e:
-                        print(f"Failed to send message: '{message}' to {peer_ip}: {e}", flush=True)
-
-    def _log_event(self, message, sender_id, received_timestamp, propagation_time, event_type, log_message):
+        # Exclude the sender (and the neighbors known to have the message) from the nodes to forward to
+        targets, seen_by = self._select_targets(sender_ip, hops, seen_by)
+        # Every send is one more hop for the message
+        hops += 1
+
+        if self.send_scheduler is not None:
+            # Schedule every send at its emulated arrival time; delays overlap across neighbors.
+            # Nothing waits for them: the handler returns (acknowledges) once they are scheduled
+            send_timestamp = time.time_ns()
+            for peer_ip, neighbor_latency in targets:
+                self.send_scheduler.call_later(float(neighbor_latency) / 1000, self._dispatch_gossip,
+                                               message, message_id, peer_ip, neighbor_latency,
+                                               send_timestamp, hops, seen_by).add_done_callback(
+                    self._check_forwarding)
+        elif self.fanout_executor is not None:
+            # Send to all peers at once, bounded by the executor size (max in-flight)
+            pending = [self.fanout_executor.submit(self._gossip_to_peer, message, message_id, peer_ip,
+                                                   neighbor_latency, hops, seen_by)
+                       for peer_ip, neighbor_latency in targets]
+            futures.wait(pending)
+        else:
+            # Send message to all peers, one after another
+            for peer_ip, neighbor_latency in targets:
+                self._gossip_to_peer(message, message_id, peer_ip, neighbor_latency, hops, seen_by)
+
+    def _select_targets(self, sender_ip, hops, seen_by):
+        """
+        Picks the neighbors to forward a message to: every neighbor except the sender
+        and the ones marked in its seen-by summary, narrowed down by the forwarding strategy.
+
+        Returns:
+            The (peer_ip, latency) pairs to send to, and the seen-by summary to send along.
+        """
+        candidates = [neighbour for neighbour in self.susceptible_nodes if neighbour[1] != sender_ip]
+        if self.seen_by is not None and seen_by:
+            unseen = [neighbour for neighbour in candidates if not self.seen_by.contains(seen_by, neighbour[0])]
+            if self.metrics is not None and len(unseen) < len(candidates):
+                # Sends saved by the summary
+                self.metrics.sends_skipped.inc('seen_by', amount=len(candidates) - len(unseen))
+            candidates = unseen
+        targets, reason = self.strategy.select(candidates, hops)
+        if self.metrics is not None and len(targets) < len(candidates):
+            self.metrics.sends_skipped.inc(reason, amount=len(candidates) - len(targets))
+        if self.seen_by is not None:
+            # This node has the message; the sender marked itself already
+            marked = [self.hostname]
+            if self.seen_by_mark == 'targets':
+                # Optimistic: a target whose send then fails stays marked and is skipped by the others
+                marked += [pod_name for pod_name, _, _ in targets]
+            seen_by = self.seen_by.mark(seen_by, marked)
+        return [(peer_ip, neighbor_latency) for _, peer_ip, neighbor_latency in targets], seen_by
+
+    def _gossip_to_peer(self, message, message_id, peer_ip, neighbor_latency, hops=1, seen_by=b''):
+        """ Emulates the edge latency and forwards the message to one neighbor """
+        # Record the send timestamp
+        send_timestamp = time.time_ns()
+
+        # Simulate latency
+        time.sleep(float(neighbor_latency) / 1000)
+
+        self._send_gossip(message, message_id, peer_ip, neighbor_latency, send_timestamp, hops, seen_by)
+
+    def _send_gossip(self, message, message_id, peer_ip, neighbor_latency, send_timestamp, hops=1, seen_by=b''):
+        request = self._gossip_request(message, message_id, neighbor_latency, send_timestamp, hops, seen_by)
+        start = time.perf_counter()
+        try:
+            self._send_to_peer(peer_ip, request)
+        except grpc.RpcError as e:
+            self._on_send_failure(peer_ip, request, e)
+        self._count_send(peer_ip, start)
+
+    def _dispatch_gossip(self, message, message_id, peer_ip, neighbor_latency, send_timestamp, hops=1,
+                         seen_by=b''):
+        """
+        Scheduled mode: runs on the timer thread once the emulated latency is over and
+        only starts the send, which completes in _on_gossip_sent (unary) or is queued
+        on the peer's stream, so the next due sends are dispatched on time.
+        """
+        request = self._gossip_request(message, message_id, neighbor_latency, send_timestamp, hops, seen_by)
+        start = time.perf_counter()
+        if self.stream_pool is not None:
+            self.stream_pool.send(peer_ip, request)
+            self._count_send(peer_ip, start)
+        else:
+            self._start_send(peer_ip, request, start)
+
+    def _gossip_request(self, message, message_id, neighbor_latency, send_timestamp, hops, seen_by):
+        if self.metrics is not None:
+            # Emulated latency as actually waited (sleep or timer heap), not as configured
+            self.metrics.latency_sleep.observe((time.time_ns() - send_timestamp) / 1e6)
+        return gossip_pb2.GossipMessage(
+            message=message,
+            message_id=message_id,
+            sender_id=self.host,
+            timestamp=send_timestamp,
+            latency_ms=neighbor_latency,  # Include latency in the gRPC message
+            hops=hops,
+            seen_by=seen_by
+        )
+
+    def _start_send(self, peer_ip, request, start, attempt=0):
+        """Starts an asynchronous SendMessage on the peer's pooled channel."""
+        entry = self.channel_pool.acquire(peer_ip)
+        try:
+            call = entry.stub.SendMessage.future(request, timeout=self.peer_timeout)
+        except BaseException:
+            self.channel_pool.release(entry)
+            raise
+        call.add_done_callback(lambda call: self._on_gossip_sent(call, entry, peer_ip, request, start, attempt))
+
+    def _on_gossip_sent(self, call, entry, peer_ip, request, start, attempt):
+        self.channel_pool.release(entry)
+        error = call.exception()
+        if error is not None:
+            self.channel_pool.report_error(peer_ip, error)
+            if attempt == 0 and error.code() == grpc.StatusCode.UNAVAILABLE:
+                # Same single retry on a fresh channel as _send_to_peer
+                self._start_send(peer_ip, request, start, attempt + 1)
+                return
+            self._on_send_failure(peer_ip, request, error)
+        self._count_send(peer_ip, start)
+
+    def _count_send(self, peer_ip, start):
+        if self.metrics is not None:
+            self.metrics.sends.inc(peer_ip)
+            self.metrics.send_duration.observe((time.perf_counter() - start) * 1000)
+
+    def _on_send_failure(self, peer_ip, request, error):
+        print(f"Failed to send message: '{request.message}' to {peer_ip}: {error}", flush=True)
+        self._forget_unreachable(peer_ip, error)
+        if self.metrics is not None:
+            self.metrics.send_failures.inc(peer_ip, error.code().name)
+
+    def _send_to_peer(self, peer_ip, request):
+        """
+        Sends a gossip message to a peer over its pooled channel.
+        A connection failure (UNAVAILABLE) replaces the channel and is retried
+        once on the fresh one; other errors are raised to the caller right away
+        and leave the channel, shared by every sender to that peer, in place.
+        With the stream transport the message is only queued on the peer's stream.
+        """
+        if self.stream_pool is not None:
+            self.stream_pool.send(peer_ip, request)
+            return
+        for attempt in range(2):
+            try:
+                with self.channel_pool.stub(peer_ip) as stub:
+                    return stub.SendMessage(request, timeout=self.peer_timeout)
+            except grpc.RpcError as e:
+                self.channel_pool.report_error(peer_ip, e)
+                if attempt == 1 or e.code() != grpc.StatusCode.UNAVAILABLE:
+                    raise
+
+    def _log_event(self, message, sender_id, received_timestamp, propagation_time, event_type, log_message,
+                   message_id=''):
         """Logs the gossip event as structured JSON data."""
+        self._count_event(event_type, propagation_time)
         event_data = {
             'message': message,
+            'message_id': message_id,
             'sender_id': sender_id,
             'receiver_id': self.host,
             'received_timestamp': received_timestamp,
@@ -188,21 +860,58 @@ class Node(gossip_pb2_grpc.GossipServiceServicer):
             'detail': log_message
         }
 
+        # Batched mode: queued and written by the background logger thread
+        if self.event_logger is not None:
+            self.event_logger.log(event_data)
+            return
+
         # Print both the log message and the JSON data to the console
         print(json.dumps(event_data), flush=True)
 
+    def _count_event(self, event_type, propagation_time):
+        if self.metrics is not None:
+            self.metrics.rpcs_received.inc(event_type)
+            if propagation_time is not None:
+                self.metrics.propagation_time.observe(propagation_time)
+
     def start_server(self):
         """ Initiating server """
-        server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+        # Inbound streams get their own MAX_STREAM_PEERS threads next to the 10 for unary calls
+        max_workers = 10 + self.max_stream_peers
+        executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        if self.metrics is not None:
+            self.metrics.watch_executor('server', executor, max_workers)
+        server = grpc.server(executor)
         gossip_pb2_grpc.add_GossipServiceServicer_to_server(self, server)
         server.add_insecure_port(f'[::]:{self.port}')
         print(f"{self.hostname}({self.host}) listening on port {self.port}", flush=True)
         server.start()
-        server.wait_for_termination()
+        if self.push_pull_interval:
+            threading.Thread(target=self._run_push_pull, name='push-pull', daemon=True).start()
+        # A pod is stopped with SIGTERM; end the wait like Ctrl-C so the queued events are written
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            server.wait_for_termination()
+        except KeyboardInterrupt:
+            print(f"{self.hostname}({self.host}) shutting down", flush=True)
+        finally:
+            # No new events once the handlers are stopped
+            server.stop(None).wait()
+            self.close_event_logger()
+
+    def close_event_logger(self):
+        """Writes out the events still queued by EVENT_LOG_MODE=batched (on shutdown)."""
+        if self.event_logger is not None:
+            self.event_logger.close()
 
 def run_server():
     service_name = os.getenv('SERVICE_NAME', 'bcgossip-svc')
-    node = Node(service_name)
+    # Runtime: 'sync' (grpc.server with a thread pool) or 'aio' (grpc.aio event loop)
+    if os.getenv('NODE_RUNTIME', 'sync') == 'aio':
+        from node_aio import AioNode
+        node = AioNode(service_name)
+    else:
+        node = Node(service_name)
     node.start_server()
 
 if __name__ == '__main__':
@@ -5,6 +5,8 @@ import socket
 from concurrent import futures
 import gossip_pb2
 import gossip_pb2_grpc
+from channel_pool import ChannelPool
+from seen_cache import SeenCache
 import json
 import time
 from kubernetes import client, config
@@ -21,7 +23,11 @@ class Node(gossip_pb2_grpc.GossipServiceServicer):
         # List to keep track of IPs of neighboring nodes
         self.susceptible_nodes = []
         # Set to keep track of messages that have been received to prevent loops
-        self.received_message = ""
+        # (bounded by SEEN_CACHE_SIZE entries, each kept for SEEN_CACHE_TTL seconds)
+        self.received_messages = SeenCache(max_entries=int(os.getenv('SEEN_CACHE_SIZE', '10000')),
+                                           ttl=float(os.getenv('SEEN_CACHE_TTL', '600')))
+        # Warm gRPC channels to neighbors, reused across gossip rounds
+        self.channel_pool = ChannelPool(self.port)
         # self.gossip_initiated = False
 
     def get_neighbours(self):
@@ -61,6 +67,9 @@ class Node(gossip_pb2_grpc.GossipServiceServicer):
                 # Add the Pod's IP and name to the list of susceptible nodes
                 self.susceptible_nodes.append((pod.metadata.name, pod.status.pod_ip))
 
+            # Drop pooled channels of peers that are no longer neighbors
+            self.channel_pool.retain(peer_ip for _, peer_ip in self.susceptible_nodes)
+
             # Optional: Log the list of neighbors for debugging
             # print(f"Susceptible nodes: {self.susceptible_nodes}", flush=True)
 
@@ -75,35 +84,39 @@ class Node(gossip_pb2_grpc.GossipServiceServicer):
         """
         message = request.message
         sender_id = request.sender_id
+        # Older senders do not set message_id; fall back to the message text
+        message_id = request.message_id or message
         received_timestamp = time.time_ns()
 
+        # Record the message and learn whether it was already received (atomic check-and-add)
+        is_new = self.received_messages.add(message_id)
+
         # For initiating acknowledgment only
         if sender_id == self.host:
-            self.received_message = message
             log_message = (f"Gossip initiated by {self.hostname} ({self.host}) at "
                            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(received_timestamp / 1e9))}")
             self._log_event(message, sender_id, received_timestamp, None,
-                            'initiate', log_message)
-            self.gossip_message(message, sender_id)
+                            'initiate', log_message, message_id)
+            self.gossip_message(message, sender_id, message_id)
             return gossip_pb2.Acknowledgment(details=f"Done propagate! {self.host} received: '{message}'")
 
         # Check whether the message is already received or not
         # Notify whether accept it or ignore it
-        elif self.received_message == message:
+        elif not is_new:
             log_message = f"{self.host} ignoring duplicate message: {message} from {sender_id}"
-            self._log_event(message, sender_id, received_timestamp, None, 'duplicate', log_message)
+            self._log_event(message, sender_id, received_timestamp, None, 'duplicate', log_message, message_id)
             return gossip_pb2.Acknowledgment(details=f"Duplicate message ignored by ({self.host})")
         else:
-            self.received_message = message
             propagation_time = (received_timestamp - request.timestamp) / 1e6
             log_message = (f"({self.hostname}({self.host}) received: '{message}' from {sender_id}"
                            f" in {propagation_time:.2f} ms ")
-            self._log_event(message, sender_id, received_timestamp, propagation_time, 'received', log_message)
+            self._log_event(message, sender_id, received_timestamp, propagation_time, 'received', log_message,
+                            message_id)
             # Start gossip only when the node is the gossip initiator itself
             # therefore, only one iteration is required
             return gossip_pb2.Acknowledgment(details=f"{self.host} received: '{message}'")
 
-    def gossip_message(self, message, sender_ip):
+    def gossip_message(self, message, sender_ip, message_id=''):
         # Refresh list of neighbors before gossiping to capture any changes
         if len(self.susceptible_nodes) == 0:
             self.get_neighbours()
@@ -117,21 +130,37 @@ class Node(gossip_pb2_grpc.GossipServiceServicer):
                 # Record the send timestamp
                 send_timestamp = time.time_ns()
 
-                with grpc.insecure_channel(f"{peer_ip}:5050") as channel:
-                    try:
-                        stub = gossip_pb2_grpc.GossipServiceStub(channel)
-                        stub.SendMessage(gossip_pb2.GossipMessage(
-                            message=message,
-                            sender_id=self.host,
-                            timestamp=send_timestamp,
-                        ))
-                    except grpc.RpcError as e:
-                        print(f"Failed to send message: '{message}' to {peer_ip}: {e}", flush=True)
-
-    def _log_event(self, message, sender_id, received_timestamp, propagation_time, event_type, log_message):
+                try:
+                    self._send_to_peer(peer_ip, gossip_pb2.GossipMessage(
+                        message=message,
+                        message_id=message_id,
+                        sender_id=self.host,
+                        timestamp=send_timestamp,
+                    ))
+                except grpc.RpcError as e:
+                    print(f"Failed to send message: '{message}' to {peer_ip}: {e}", flush=True)
+
+    def _send_to_peer(self, peer_ip, request):
+        """
+        Sends a gossip message to a peer over its pooled channel.
+        A connection failure (UNAVAILABLE) replaces the channel and is retried
+        once on the fresh one; other errors are raised to the caller right away.
+        """
+        for attempt in range(2):
+            try:
+                with self.channel_pool.stub(peer_ip) as stub:
+                    return stub.SendMessage(request)
+            except grpc.RpcError as e:
+                self.channel_pool.report_error(peer_ip, e)
+                if attempt == 1 or e.code() != grpc.StatusCode.UNAVAILABLE:
+                    raise
+
+    def _log_event(self, message, sender_id, received_timestamp, propagation_time, event_type, log_message,
+                   message_id=''):
         """Logs the gossip event as structured JSON data."""
         event_data = {
             'message': message,
+            'message_id': message_id,
             'sender_id': sender_id,
             'receiver_id': self.host,
             'received_timestamp': received_timestamp,
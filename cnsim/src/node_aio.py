@@ -0,0 +1,419 @@
+import asyncio
+import grpc
+import json
+import random
+import signal
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+import gossip_pb2
+import gossip_pb2_grpc
+from channel_pool import RECONNECT_CODES, PooledChannel
+from node import Node, ReloadBroadcastError
+from stream_sender import message_key
+
+
+class AioNode(Node):
+    """
+    asyncio (grpc.aio) runtime of the gossip node.
+
+    Topology and neighbor discovery are shared with Node; receiving, fan-out,
+    latency emulation and logging run as coroutines on a single event loop, so
+    in-flight gossip RPCs are not bounded by a thread pool.
+    """
+
+    # Connectivity states that mean the channel will not recover by itself
+    UNHEALTHY_STATES = (grpc.ChannelConnectivity.TRANSIENT_FAILURE,
+                        grpc.ChannelConnectivity.SHUTDOWN)
+
+    def __init__(self, service_name):
+        # Set before Node.__init__ starts the watch and DNS refresh threads, whose neighbor-list
+        # rebuilds reach _retain_peers right away
+        # peer_ip -> PooledChannel of a grpc.aio channel
+        self.aio_channels = {}
+        # TRANSPORT=stream: peer_ip -> (queue of messages, task writing them to a GossipStream call)
+        self.aio_streams = {}
+        # Event loop of the server, created by start_server_async
+        self.loop = None
+        super().__init__(service_name)
+        # The thread-based StreamPool of Node is not used
+        self.stream_pool = None
+        # Queued fan-outs (ACK_MODE=immediate and GossipStream), referenced until they finish
+        self.forward_tasks = set()
+        # Created inside the running event loop (see start_server_async)
+        self.send_limit = None
+        self.forward_limit = None
+        self.log_queue = None
+
+    async def SendMessage(self, request, context):
+
+        """
+        Receiving message from other nodes
+        and distribute it to others (multi rounds gossip)
+        """
+        return await self._handle_message(request, context, self.ack_mode == 'immediate')
+
+    async def _handle_message(self, request, context, queue_forwarding):
+        if self.metrics is None:
+            return await self._receive_message(request, context, queue_forwarding)
+        self.metrics.handlers_started.inc()
+        start = time.perf_counter()
+        try:
+            return await self._receive_message(request, context, queue_forwarding)
+        finally:
+            self.metrics.handler_duration.observe((time.perf_counter() - start) * 1000)
+            self.metrics.handlers_finished.inc()
+
+    async def _receive_message(self, request, context, queue_forwarding=False):
+        message = request.message
+        sender_id = request.sender_id
+        # Older senders do not set message_id; fall back to the message text
+        message_id = request.message_id or message
+        received_timestamp = time.time_ns()
+
+        # Record the message and learn whether it was already received
+        is_new = self.received_messages.add(message_id)
+
+        # For initiating acknowledgment only
+        if sender_id == self.host:
+            log_message = (f"Gossip initiated by {self.hostname} ({self.host}) at "
+                           f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(received_timestamp / 1e9))}")
+            self._log_event(message, sender_id, received_timestamp, None,
+                            'initiate', log_message, message_id)
+            self._store_message(message_id, message, request.hops)
+            await self.gossip_message(message, sender_id, message_id, request.hops)
+            return gossip_pb2.Acknowledgment(details=f"Done propagate! {self.host} received: '{message}'")
+
+        # Check whether the message is already received or no
+        # Notify whether accept it or ignore it
+        elif not is_new:
+            log_message = f"{self.host} ignoring duplicate message: {message} from {sender_id}"
+            self._log_event(message, sender_id, received_timestamp, None, 'duplicate', log_message, message_id)
+            return gossip_pb2.Acknowledgment(details=f"Duplicate message ignored by ({self.host})")
+        # Distribute gossip
+        # Once received, distribute to connected neighbors
+        else:
+            propagation_time = (received_timestamp - request.timestamp) / 1e6
+            log_message = (f"({self.hostname}({self.host}) received: '{message}' from {sender_id}"
+                           f" in {propagation_time:.2f} ms ")
+            self._log_event(message, sender_id, received_timestamp, propagation_time, 'received', log_message,
+                            message_id)
+            self._store_message(message_id, message, request.hops)
+            if queue_forwarding:
+                # Acknowledge now; the fan-out runs as a task, FORWARD_WORKERS at a time
+                task = asyncio.ensure_future(self._forward(message, sender_id, message_id, request.hops,
+                                                           request.seen_by))
+                self.forward_tasks.add(task)
+                task.add_done_callback(self.forward_tasks.discard)
+            else:
+                await self.gossip_message(message, sender_id, message_id, request.hops,
+                                          request.seen_by) # key distribution
+            return gossip_pb2.Acknowledgment(details=f"{self.host} received: '{message}'")
+
+    async def _forward(self, message, sender_id, message_id, hops, seen_by):
+        async with self.forward_limit:
+            await self.gossip_message(message, sender_id, message_id, hops, seen_by)
+
+    async def GossipStream(self, request_iterator, context):
+        """
+        Receives the gossip messages a neighbor pipelines over one long-lived
+        stream; each one is checked and logged on arrival, its fan-out queued
+        and the message acknowledged right away.
+        """
+        async for request in request_iterator:
+            await self._handle_message(request, context, True)
+            yield gossip_pb2.StreamAck(message_ids=[message_key(request)])
+
+    async def PushPull(self, request, context):
+        return self._digest_reply(request)
+
+    async def _run_push_pull(self):
+        while True:
+            await asyncio.sleep(self.push_pull_interval)
+            try:
+                await self.push_pull()
+            except Exception as e:
+                print(f"Push-pull failed: {e!r}", flush=True)
+
+    async def push_pull(self):
+        if len(self.susceptible_nodes) == 0:
+            await asyncio.to_thread(self.get_neighbours)
+        if len(self.susceptible_nodes) == 0:
+            return
+        _, peer_ip, neighbor_latency = random.choice(self.susceptible_nodes)
+        send_timestamp = time.time_ns()
+        # The digest travels over the emulated edge like any gossip message
+        await asyncio.sleep(float(neighbor_latency) / 1000)
+        digest = gossip_pb2.Digest(sender_id=self.host, message_ids=self.message_store.message_ids())
+        try:
+            with self._peer_stub(peer_ip) as stub:
+                reply = await stub.PushPull(digest, timeout=self.peer_timeout)
+        except grpc.RpcError as e:
+            self._report_error(peer_ip, e)
+            print(f"Push-pull with {peer_ip} failed: {e.code()} {e.details()}", flush=True)
+            self._count_push_pull('failed')
+            return
+        self._count_push_pull('ok', len(reply.messages), len(reply.missing_ids))
+        for request in reply.messages:
+            request.timestamp = send_timestamp
+            request.latency_ms = float(neighbor_latency)
+            await self._handle_message(request, None, True)
+        pushes = []
+        for message_id in reply.missing_ids:
+            entry = self.message_store.get(message_id)
+            if entry is not None:
+                pushes.append(self._gossip_to_peer(entry[0], message_id, peer_ip, neighbor_latency, entry[1] + 1))
+        await asyncio.gather(*pushes)
+
+    async def Initiate(self, request, context):
+        received_timestamp = time.time_ns()
+        message_id = request.message_id or uuid.uuid4().hex
+        ack = await self.SendMessage(gossip_pb2.GossipMessage(
+            message=request.message,
+            message_id=message_id,
+            sender_id=self.host,
+            timestamp=received_timestamp,
+            latency_ms=0.0
+        ), context)
+        return self._initiate_reply(ack, message_id, received_timestamp)
+
+    async def Reload(self, request, context):
+        # Topology loading and neighbor discovery are blocking; run them off the event loop
+        try:
+            return await asyncio.to_thread(self._reload, request)
+        except FileNotFoundError as e:
+            await context.abort(grpc.StatusCode.NOT_FOUND, str(e))
+        except ReloadBroadcastError as e:
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+
+    async def gossip_message(self, message, sender_ip, message_id='', hops=0, seen_by=b''):
+        # Refresh list of neighbors before gossiping to capture any changes
+        # (the Kubernetes client is blocking, so it runs in a worker thread)
+        if len(self.susceptible_nodes) == 0:
+            await asyncio.to_thread(self.get_neighbours)
+            print(f"self.susceptible_nodes: {self.susceptible_nodes}", flush=True)
+
+        # Send to the neighbors picked by the strategy (never the sender) concurrently
+        targets, seen_by = self._select_targets(sender_ip, hops, seen_by)
+        await asyncio.gather(*(self._gossip_to_peer(message, message_id, peer_ip, neighbor_latency, hops + 1,
+                                                    seen_by)
+                               for peer_ip, neighbor_latency in targets))
+
+    async def _gossip_to_peer(self, message, message_id, peer_ip, neighbor_latency, hops=1, seen_by=b''):
+        """ Emulates the edge latency and forwards the message to one neighbor """
+        # Record the send timestamp
+        send_timestamp = time.time_ns()
+
+        # Simulate latency without blocking the event loop
+        await asyncio.sleep(float(neighbor_latency) / 1000)
+        if self.metrics is not None:
+            self.metrics.latency_sleep.observe((time.time_ns() - send_timestamp) / 1e6)
+            start = time.perf_counter()
+
+        request = gossip_pb2.GossipMessage(
+            message=message,
+            message_id=message_id,
+            sender_id=self.host,
+            timestamp=send_timestamp,
+            latency_ms=neighbor_latency,  # Include latency in the gRPC message
+            hops=hops,
+            seen_by=seen_by
+        )
+        if self.transport == 'stream':
+            # Queued on the neighbor's stream; the acknowledgment is collected by _run_stream
+            self._stream_queue(peer_ip).put_nowait(request)
+            if self.metrics is not None:
+                self.metrics.sends.inc(peer_ip)
+            return
+        async with self.send_limit:
+            try:
+                await self._send_message(peer_ip, request)
+            except grpc.RpcError as e:
+                print(f"Failed to send message: '{message}' to {peer_ip}: {e}", flush=True)
+                if self.metrics is not None:
+                    self.metrics.send_failures.inc(peer_ip, e.code().name)
+        if self.metrics is not None:
+            self.metrics.sends.inc(peer_ip)
+            self.metrics.send_duration.observe((time.perf_counter() - start) * 1000)
+
+    async def _send_message(self, peer_ip, request):
+        """
+        Sends a gossip message over the peer's pooled channel. As in Node._send_to_peer,
+        a connection failure (UNAVAILABLE) replaces the channel and is retried once on
+        the fresh one (e.g. a restarted peer); other errors are raised right away.
+        """
+        for attempt in range(2):
+            try:
+                with self._peer_stub(peer_ip) as stub:
+                    return await stub.SendMessage(request, timeout=self.peer_timeout)
+            except grpc.RpcError as e:
+                self._report_error(peer_ip, e)
+                if attempt == 1 or e.code() != grpc.StatusCode.UNAVAILABLE:
+                    raise
+
+    def _stream_queue(self, peer_ip):
+        """Returns the send queue of a neighbor, opening its stream when there is none (or it failed)."""
+        entry = self.aio_streams.get(peer_ip)
+        if entry is None or entry[1].done():
+            queue = asyncio.Queue()
+            entry = self.aio_streams[peer_ip] = (queue, asyncio.ensure_future(self._run_stream(peer_ip, queue)))
+        return entry[0]
+
+    async def _run_stream(self, peer_ip, queue):
+        """Writes the queued messages of one neighbor to a GossipStream call until None is queued."""
+        with self._peer_stub(peer_ip) as stub:
+            await self._write_stream(peer_ip, queue, stub.GossipStream())
+
+    async def _write_stream(self, peer_ip, queue, call):
+        unacked = {}
+
+        async def read_acks():
+            async for ack in call:
+                for message_id in ack.message_ids:
+                    unacked.pop(message_id, None)
+
+        reader = asyncio.ensure_future(read_acks())
+        try:
+            while True:
+                # Wake up on the next message, or as soon as the stream ends or fails
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, reader}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    reader.result()
+                    return
+                request = getter.result()
+                if request is None:
+                    await call.done_writing()
+                    await reader
+                    return
+                unacked[message_key(request)] = request
+                await call.write(request)
+        except (grpc.RpcError, asyncio.InvalidStateError) as e:
+            if isinstance(e, grpc.RpcError):
+                self._report_error(peer_ip, e)
+            # The next message to this neighbor opens a new stream
+            for request in list(unacked.values()):
+                print(f"Failed to send message: '{request.message}' to {peer_ip}: {e}", flush=True)
+                if self.metrics is not None:
+                    self.metrics.send_failures.inc(peer_ip, 'STREAM_FAILED')
+        finally:
+            reader.cancel()
+
+    @contextmanager
+    def _peer_stub(self, peer_ip):
+        """
+        Yields the cached stub of a peer, reconnecting when the channel is unhealthy.
+        The call must be awaited inside the block, so that a replaced channel is
+        only closed once its last call is done.
+        """
+        entry = self.aio_channels.get(peer_ip)
+        if entry is None or entry.channel.get_state() in self.UNHEALTHY_STATES:
+            if entry is not None:
+                self._retire_channel(peer_ip)
+            channel = grpc.aio.insecure_channel(f"{peer_ip}:{self.port}")
+            entry = self.aio_channels[peer_ip] = PooledChannel(channel, gossip_pb2_grpc.GossipServiceStub(channel))
+        entry.acquire()
+        try:
+            yield entry.stub
+        finally:
+            if entry.release():
+                asyncio.ensure_future(entry.channel.close())
+
+    def _report_error(self, peer_ip, error):
+        # Only a broken connection replaces the channel; a slow peer (DEADLINE_EXCEEDED) keeps it
+        if error.code() in RECONNECT_CODES:
+            self._retire_channel(peer_ip)
+        self._forget_unreachable(peer_ip, error)
+
+    def _retire_channel(self, peer_ip):
+        entry = self.aio_channels.pop(peer_ip, None)
+        if entry is not None and entry.retire():
+            # Close in the background; with calls running it is closed by the last one
+            asyncio.ensure_future(entry.channel.close())
+
+    def _retain_peers(self):
+        # Called on every neighbor-list rebuild, from worker threads (API or DNS refresh, Reload)
+        # and the watch thread alike; the aio channels and streams belong to the event loop
+        super()._retain_peers()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._retain_channels)
+
+    def _retain_channels(self):
+        """Closes channels of peers that are no longer neighbors (on the event loop)."""
+        keep = {peer_ip for _, peer_ip, _ in self.susceptible_nodes}
+        for peer_ip in [ip for ip in self.aio_streams if ip not in keep]:
+            self.aio_streams.pop(peer_ip)[0].put_nowait(None)
+        for peer_ip in [ip for ip in self.aio_channels if ip not in keep]:
+            self._retire_channel(peer_ip)
+
+    def _log_event(self, message, sender_id, received_timestamp, propagation_time, event_type, log_message,
+                   message_id=''):
+        """
+        Queues the gossip event; it is written to the console by _write_log_events, or
+        by the EventLogger thread with EVENT_LOG_MODE=batched (file, binary records and
+        duplicate sampling included).
+        """
+        self._count_event(event_type, propagation_time)
+        event_data = {
+            'message': message,
+            'message_id': message_id,
+            'sender_id': sender_id,
+            'receiver_id': self.host,
+            'received_timestamp': received_timestamp,
+            'propagation_time': propagation_time,
+            'event_type': event_type,
+            'detail': log_message
+        }
+        # EventLogger.log only enqueues, so it does not block the event loop either
+        if self.event_logger is not None:
+            self.event_logger.log(event_data)
+            return
+        self.log_queue.put_nowait(event_data)
+
+    async def _write_log_events(self):
+        """Drains the log queue, writing everything queued so far with a single flush."""
+        while True:
+            lines = [json.dumps(await self.log_queue.get())]
+            while not self.log_queue.empty():
+                lines.append(json.dumps(self.log_queue.get_nowait()))
+            sys.stdout.write('\n'.join(lines) + '\n')
+            sys.stdout.flush()
+
+    async def start_server_async(self):
+        """ Initiating asyncio server """
+        self.loop = asyncio.get_running_loop()
+        self.send_limit = asyncio.Semaphore(self.max_in_flight)
+        self.forward_limit = asyncio.Semaphore(self.forward_workers)
+        self.log_queue = asyncio.Queue()
+        log_writer = asyncio.create_task(self._write_log_events())
+
+        server = grpc.aio.server()
+        gossip_pb2_grpc.add_GossipServiceServicer_to_server(self, server)
+        server.add_insecure_port(f'[::]:{self.port}')
+        print(f"{self.hostname}({self.host}) listening on port {self.port} (aio)", flush=True)
+        await server.start()
+        push_pull = None
+        if self.push_pull_interval:
+            push_pull = asyncio.create_task(self._run_push_pull())
+        # A pod is stopped with SIGTERM; stop the server so the queued events are written below
+        self.loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(server.stop(None)))
+        try:
+            await server.wait_for_termination()
+        finally:
+            print(f"{self.hostname}({self.host}) shutting down", flush=True)
+            await server.stop(None)
+            log_writer.cancel()
+            if push_pull is not None:
+                push_pull.cancel()
+            # Events queued after the last write of _write_log_events
+            lines = []
+            while not self.log_queue.empty():
+                lines.append(json.dumps(self.log_queue.get_nowait()) + '\n')
+            sys.stdout.write(''.join(lines))
+            sys.stdout.flush()
+            await asyncio.to_thread(self.close_event_logger)
+
+    def start_server(self):
+        asyncio.run(self.start_server_async())
@@ -0,0 +1,79 @@
+import threading
+import time
+from kubernetes import client, config, watch
+
+
+class PodInformer:
+    """
+    Live pod name -> IP map of the gossip pods, kept up to date by a Kubernetes
+    watch on the pod label selector.
+
+    The map is listed once, then updated incrementally from ADDED / MODIFIED /
+    DELETED events. Readers only do dictionary lookups; on_change(pod_name) is
+    called from the watch thread whenever the IP of a pod changes or it goes away.
+    """
+
+    def __init__(self, namespace, label_selector, on_change=None, watch_timeout=300):
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.on_change = on_change
+        # Server-side timeout of one watch request; the watch is re-established after it
+        self.watch_timeout = watch_timeout
+        self.pod_ips = {}
+        # Set once the initial list has been loaded
+        self.synced = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='pod-informer', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        # Load in-cluster config (for running inside Kubernetes)
+        config.load_incluster_config()
+        v1 = client.CoreV1Api()
+
+        while True:
+            try:
+                # (Re)list to get a consistent starting point and resource version
+                ret = v1.list_namespaced_pod(namespace=self.namespace, label_selector=self.label_selector)
+                listed = {pod.metadata.name: pod.status.pod_ip for pod in ret.items if pod.status.pod_ip}
+                with self._lock:
+                    previous, self.pod_ips = self.pod_ips, listed
+                self.synced.set()
+                for pod_name in set(previous) | set(listed):
+                    if previous.get(pod_name) != listed.get(pod_name):
+                        self._notify(pod_name)
+
+                # Then follow incremental changes from that resource version
+                stream = watch.Watch().stream(v1.list_namespaced_pod, namespace=self.namespace,
+                                              label_selector=self.label_selector,
+                                              resource_version=ret.metadata.resource_version,
+                                              timeout_seconds=self.watch_timeout)
+                for event in stream:
+                    self._apply(event['type'], event['object'])
+
+            except client.ApiException as e:
+                # 410 Gone means the resource version expired; relist without noise
+                if e.status != 410:
+                    print(f"Pod watch failed: {e}", flush=True)
+                    time.sleep(1)
+            except Exception as e:
+                print(f"Pod watch interrupted: {e}", flush=True)
+                time.sleep(1)
+
+    def _apply(self, event_type, pod):
+        pod_name = pod.metadata.name
+        pod_ip = pod.status.pod_ip if event_type != 'DELETED' else None
+        with self._lock:
+            if pod_ip:
+                changed = self.pod_ips.get(pod_name) != pod_ip
+                self.pod_ips[pod_name] = pod_ip
+            else:
+                changed = self.pod_ips.pop(pod_name, None) is not None
+        if changed:
+            self._notify(pod_name)
+
+    def _notify(self, pod_name):
+        if self.on_change is not None:
+            self.on_change(pod_name)
@@ -0,0 +1,96 @@
+import csv
+import os
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class ResultWriter:
+    """
+    Appends result rows to a CSV file, or to a Parquet dataset directory (one
+    part file per session) when the output ends in .parquet and pyarrow is
+    installed. Rows already in the output are reported by completed_keys().
+    """
+
+    def __init__(self, path, columns, schema=None, key_columns=None, row_group_size=1000):
+        """
+        Args:
+            path: Output CSV file, or Parquet directory ending in .parquet.
+            columns: CSV column names, in order.
+            schema: pyarrow schema of the Parquet rows.
+            key_columns: Columns identifying a row, for completed_keys().
+            row_group_size: Rows buffered per Parquet row group.
+        """
+        self.path = path
+        self.columns = columns
+        self.schema = schema
+        self.key_columns = key_columns or []
+        self.parquet = path.endswith('.parquet')
+        if self.parquet and pa is None:
+            raise ValueError("Parquet output needs pyarrow; use a .csv output instead")
+        self.row_group_size = row_group_size
+        self._rows = []
+        self._writer = None
+        self._file = None
+
+    def completed_keys(self):
+        """Returns the keys of the rows written by earlier (possibly interrupted) sessions."""
+        if self.parquet:
+            if not os.path.isdir(self.path):
+                return set()
+            keys = set()
+            for part in sorted(os.listdir(self.path)):
+                if not part.endswith('.parquet'):
+                    continue
+                try:
+                    table = pq.read_table(os.path.join(self.path, part), columns=self.key_columns)
+                except pa.ArrowInvalid:
+                    # Part file of a killed session without a footer; its rows are simply redone
+                    print(f"Ignoring unreadable part file {part}", flush=True)
+                    continue
+                keys.update(zip(*(table.column(column).to_pylist() for column in self.key_columns)))
+            return keys
+        if not os.path.isfile(self.path):
+            return set()
+        with open(self.path, 'r', newline='') as f:
+            return {tuple(row[column] for column in self.key_columns) for row in csv.DictReader(f)}
+
+    def write(self, rows):
+        if self.parquet:
+            self._rows.extend(rows)
+            if len(self._rows) >= self.row_group_size:
+                self._flush_parquet()
+            return
+        if self._file is None:
+            new_file = not os.path.isfile(self.path) or os.path.getsize(self.path) == 0
+            self._file = open(self.path, 'a', newline='')
+            self._writer = csv.DictWriter(self._file, fieldnames=self.columns)
+            if new_file:
+                self._writer.writeheader()
+        self._writer.writerows(rows)
+        # Flush per call so that an interrupted session keeps everything written so far
+        self._file.flush()
+
+    def close(self):
+        if self.parquet:
+            self._flush_parquet()
+            if self._writer is not None:
+                self._writer.close()
+        elif self._file is not None:
+            self._file.close()
+
+    def _flush_parquet(self):
+        if not self._rows:
+            return
+        table = pa.Table.from_pylist(self._rows, schema=self.schema)
+        if self._writer is None:
+            os.makedirs(self.path, exist_ok=True)
+            part = os.path.join(self.path, f"part-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}.parquet")
+            self._writer = pq.ParquetWriter(part, table.schema)
+        self._writer.write_table(table)
+        self._rows = []
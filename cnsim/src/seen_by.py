@@ -0,0 +1,68 @@
+import hashlib
+
+MODES = ('off', 'bitmap', 'bloom')
+
+
+def node_ordinal(node_name):
+    """Returns the StatefulSet ordinal of a pod name (gossip-statefulset-<ordinal>), or None."""
+    _, _, ordinal = node_name.rpartition('-')
+    return int(ordinal) if ordinal.isdigit() else None
+
+
+class SeenBy:
+    """
+    Compact summary of the nodes known to have a gossip message, piggybacked on
+    GossipMessage.seen_by, so that a forwarder can skip the neighbors that
+    already got (or are being sent) the message.
+
+    bitmap  one bit per StatefulSet ordinal, exact (the message grows by one
+            byte per 8 nodes); nodes without an ordinal are never marked
+    bloom   Bloom filter of the node names in `bloom_bits` bits, fixed size; a
+            false positive skips a neighbor that may not have the message yet
+    """
+
+    def __init__(self, mode='bitmap', bloom_bits=512, bloom_hashes=3):
+        if mode not in MODES[1:]:
+            raise ValueError(f"Unknown seen-by mode: {mode}")
+        self.mode = mode
+        self.bloom_bits = bloom_bits
+        self.bloom_hashes = bloom_hashes
+        # node name -> bit positions (neighbors are looked up for every message)
+        self._positions = {}
+
+    def positions(self, node_name):
+        positions = self._positions.get(node_name)
+        if positions is None:
+            if self.mode == 'bitmap':
+                ordinal = node_ordinal(node_name)
+                positions = (ordinal,) if ordinal is not None else ()
+            else:
+                # Double hashing: bit i is h1 + i * h2
+                digest = hashlib.blake2b(node_name.encode('utf-8'), digest_size=8).digest()
+                h1, h2 = int.from_bytes(digest[:4], 'little'), int.from_bytes(digest[4:], 'little') | 1
+                positions = tuple((h1 + i * h2) % self.bloom_bits for i in range(self.bloom_hashes))
+            self._positions[node_name] = positions
+        return positions
+
+    def contains(self, summary, node_name):
+        positions = self.positions(node_name)
+        if not positions:
+            return False
+        for position in positions:
+            byte = position >> 3
+            if byte >= len(summary) or not summary[byte] & (1 << (position & 7)):
+                return False
+        return True
+
+    def mark(self, summary, node_names):
+        """Returns a copy of the summary with the given nodes added."""
+        marked = bytearray(summary)
+        if self.mode == 'bloom' and len(marked) < self.bloom_bits // 8:
+            marked.extend(bytes(self.bloom_bits // 8 - len(marked)))
+        for node_name in node_names:
+            for position in self.positions(node_name):
+                byte = position >> 3
+                if byte >= len(marked):
+                    marked.extend(bytes(byte + 1 - len(marked)))
+                marked[byte] |= 1 << (position & 7)
+        return bytes(marked)
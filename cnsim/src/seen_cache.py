@@ -0,0 +1,54 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class SeenCache:
+    """
+    Thread-safe set of recently seen message IDs with LRU and TTL eviction.
+
+    Entries are kept in last-seen order, so both the oldest entry (LRU) and
+    the expired entries (TTL) are always at the front of the dictionary.
+    Memory stays bounded by max_entries however many gossips run at once.
+    """
+
+    def __init__(self, max_entries=10000, ttl=600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # message_id -> last seen time (monotonic seconds)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, message_id):
+        """
+        Marks a message ID as seen.
+
+        Returns:
+            True if the ID was not seen before (first delivery), False for a duplicate.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            is_new = message_id not in self._entries
+            self._entries[message_id] = now
+            self._entries.move_to_end(message_id)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return is_new
+
+    def __contains__(self, message_id):
+        with self._lock:
+            self._expire(time.monotonic())
+            return message_id in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _expire(self, now):
+        deadline = now - self.ttl
+        while self._entries:
+            _, last_seen = next(iter(self._entries.items()))
+            if last_seen > deadline:
+                break
+            self._entries.popitem(last=False)
@@ -0,0 +1,94 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent import futures
+
+
+class DelayScheduler:
+    """
+    Heap-based delayed-send scheduler used to emulate link latency.
+
+    Instead of sleeping on the caller thread, every send is pushed into a heap
+    keyed by its dispatch time. A single timer thread pops due entries and runs
+    them, so the emulated latencies of different neighbors overlap the way real
+    network links do.
+
+    Due calls run on the timer thread itself and must not block (e.g. they only
+    start an asynchronous RPC): a call waiting for a peer would hold back every
+    later dispatch. Blocking calls need an executor, whose queue then adds to the
+    emulated delay once all its workers are busy.
+    """
+
+    def __init__(self, executor=None):
+        """
+        Args:
+            executor: Runs the due calls instead of the timer thread (not shut
+                down by the scheduler).
+        """
+        self._heap = []
+        # Tie-breaker so entries with the same dispatch time keep FIFO order
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._running = True
+        self._executor = executor
+        self._thread = threading.Thread(target=self._run, name='delay-scheduler', daemon=True)
+        self._thread.start()
+
+    def call_later(self, delay, fn, *args):
+        """
+        Schedules fn(*args) to run after `delay` seconds.
+
+        Returns:
+            A concurrent.futures.Future holding the result of fn.
+        """
+        future = futures.Future()
+        dispatch_time = time.monotonic() + max(delay, 0.0)
+        with self._condition:
+            heapq.heappush(self._heap, (dispatch_time, next(self._sequence), future, fn, args))
+            # Wake up the timer thread only if this entry is now the earliest one
+            if self._heap[0][2] is future:
+                self._condition.notify()
+        return future
+
+    def __len__(self):
+        """Number of calls waiting for their dispatch time."""
+        with self._condition:
+            return len(self._heap)
+
+    def shutdown(self):
+        """Stops the timer thread; pending entries are cancelled."""
+        with self._condition:
+            self._running = False
+            pending, self._heap = self._heap, []
+            self._condition.notify()
+        for _, _, future, _, _ in pending:
+            future.cancel()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._heap:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                dispatch_time = self._heap[0][0]
+                remaining = dispatch_time - time.monotonic()
+                if remaining > 0:
+                    # Sleep until the earliest entry is due (or an earlier one arrives)
+                    self._condition.wait(remaining)
+                    continue
+                _, _, future, fn, args = heapq.heappop(self._heap)
+            if self._executor is None:
+                self._dispatch(future, fn, args)
+            else:
+                self._executor.submit(self._dispatch, future, fn, args)
+
+    @staticmethod
+    def _dispatch(future, fn, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
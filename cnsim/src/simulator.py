@@ -0,0 +1,315 @@
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import time
+import uuid
+from gossip_strategy import STRATEGIES, ForwardingStrategy
+from topology_binary import BINARY_SUFFIX, load_topology_binary
+from topology_stream import load_topology_json
+
+
+class GossipSimulator:
+    """
+    Discrete-event simulator of the gossip implemented by node.py.
+
+    Events are kept in a priority queue ordered by simulated time (ns) and replay
+    the SendMessage / gossip_message semantics of the cloud-native nodes:
+    a node receiving a message for the first time logs 'received' and forwards
+    it to all neighbors except the sender, later copies are logged as
+    'duplicate', and an RPC is acknowledged only once the receiver finished its
+    own fan-out. Edge weights are the emulated latencies (ms) before each send.
+
+    fanout='sequential' sends to one neighbor after another, waiting for each
+    acknowledgment (FANOUT_MODE=sequential); fanout='parallel' sends to all
+    neighbors at once (FANOUT_MODE=parallel or LATENCY_EMULATION=scheduled).
+
+    The forwarding strategy (GOSSIP_STRATEGY, GOSSIP_TTL) picks the neighbors
+    each node forwards to. With push_pull_interval, every node also runs
+    push_pull_rounds anti-entropy exchanges (PUSH_PULL_INTERVAL) with a random
+    neighbor, at a random phase: the digest reaches the neighbor after the edge
+    latency, a message the neighbor has is pulled with the reply and a message
+    only the node has is pushed over the edge again.
+
+    With seen_by (SEEN_BY=bitmap), every forwarded message carries the set of
+    nodes known to have it (the forwarders so far, plus the neighbors they sent
+    it to with seen_by_mark_targets, SEEN_BY_MARK=targets), and those neighbors
+    are skipped; anti-entropy messages carry none.
+    """
+
+    def __init__(self, node_names, neighbours, fanout='sequential', strategy=None, push_pull_interval=None,
+                 push_pull_rounds=10, seen_by=False, seen_by_mark_targets=False, seed=None):
+        """
+        Args:
+            node_names: Node names, in topology order.
+            neighbours: For each node, a list of (neighbor_index, latency_ms).
+            fanout: 'sequential' or 'parallel'.
+            strategy: ForwardingStrategy of the nodes (default: flood).
+            push_pull_interval: Milliseconds between anti-entropy exchanges of a node (None disables them).
+            push_pull_rounds: Anti-entropy exchanges per node and gossip.
+            seen_by: Skip the neighbors marked in the seen-by summary of the message.
+            seen_by_mark_targets: Forwarders also mark the neighbors they send to.
+            seed: Seed of the strategy and anti-entropy draws.
+        """
+        if fanout not in ('sequential', 'parallel'):
+            raise ValueError(f"Unknown fanout mode: {fanout}")
+        self.node_names = node_names
+        self.neighbours = neighbours
+        self.fanout = fanout
+        self.strategy = strategy or ForwardingStrategy()
+        self.push_pull_interval = push_pull_interval
+        self.push_pull_rounds = push_pull_rounds
+        self.seen_by = seen_by
+        self.seen_by_mark_targets = seen_by_mark_targets
+        self.rng = random.Random(seed)
+        # Anti-entropy digests exchanged and sends saved by seen-by summaries in the last run
+        self.digests = 0
+        self.sends_saved = 0
+
+    @classmethod
+    def from_topology_file(cls, path, latency_option='weight', **kwargs):
+        """Builds a simulator from a topology json (node-link) or binary (.cnt) file."""
+        if path.endswith(BINARY_SUFFIX):
+            topology = load_topology_binary(path)
+            node_names = [name.decode('utf-8') for name in topology.names]
+            edges = zip(topology.sources.tolist(), topology.targets.tolist(), topology.weights.tolist())
+        else:
+            topology = load_topology_json(path)
+            node_names = [node['id'] for node in topology['nodes']]
+            position = {name: i for i, name in enumerate(node_names)}
+            edges = ((position[edge['source']], position[edge['target']], edge.get(latency_option) or 0)
+                     for edge in topology['edges'])
+
+        neighbours = [[] for _ in node_names]
+        for source, target, latency in edges:
+            neighbours[source].append((target, float(latency)))
+            neighbours[target].append((source, float(latency)))
+        return cls(node_names, neighbours, **kwargs)
+
+    def run(self, initiator, message, message_id=None, start_timestamp=None):
+        """
+        Simulates one gossip started at `initiator` (node index or name).
+
+        Returns:
+            A list of event dictionaries with the same fields as Node._log_event,
+            ordered by received_timestamp.
+        """
+        if isinstance(initiator, str):
+            initiator = self.node_names.index(initiator)
+        message_id = message_id or message
+        start_timestamp = time.time_ns() if start_timestamp is None else start_timestamp
+        names = self.node_names
+        num_nodes = len(names)
+
+        queue = []
+        sequence = itertools.count()
+        events = []
+        seen = [False] * num_nodes
+        hops = [0] * num_nodes              # hops the message travelled to each node
+        # Seen-by summaries as bitmasks of node indices: received with the message, and sent along
+        seen_by = [0] * num_nodes
+        forwarded_seen_by = [0] * num_nodes
+        # Forwarding state of every node that received the message
+        upstream = [None] * num_nodes       # node waiting for our acknowledgment
+        targets = [None] * num_nodes        # neighbors to forward to
+        next_target = [0] * num_nodes       # sequential mode: next neighbor to send to
+        pending_acks = [0] * num_nodes      # parallel mode: acknowledgments still expected
+
+        def log(receiver, sender, now, propagation_time, event_type, detail):
+            events.append({
+                'message': message,
+                'message_id': message_id,
+                'sender_id': names[sender],
+                'receiver_id': names[receiver],
+                'received_timestamp': start_timestamp + now,
+                'propagation_time': propagation_time,
+                'event_type': event_type,
+                'detail': detail
+            })
+
+        def send(sender, receiver, latency, now, kind='deliver'):
+            # The send timestamp is taken before the emulated latency, as in the node
+            heapq.heappush(queue, (now + round(latency * 1e6), next(sequence), kind, receiver, sender, now,
+                                   hops[sender] + 1))
+
+        def acknowledge(node, now):
+            # The RPC that delivered the message to `node` returns to its sender
+            if upstream[node] is not None:
+                heapq.heappush(queue, (now, next(sequence), 'ack', upstream[node], node, now, 0))
+
+        def send_next(node, now):
+            if next_target[node] < len(targets[node]):
+                receiver, latency = targets[node][next_target[node]]
+                next_target[node] += 1
+                send(node, receiver, latency, now)
+            else:
+                acknowledge(node, now)
+
+        def start_forwarding(node, sender, now, acknowledged=True):
+            upstream[node] = sender if acknowledged else None
+            # Exclude the sender from the list of nodes to forward the message to
+            candidates = [(peer, latency) for peer, latency in self.neighbours[node] if peer != sender]
+            if self.seen_by:
+                unseen = [(peer, latency) for peer, latency in candidates if not seen_by[node] >> peer & 1]
+                self.sends_saved += len(candidates) - len(unseen)
+                candidates = unseen
+            targets[node], _ = self.strategy.select(candidates, hops[node], self.rng)
+            forwarded_seen_by[node] = seen_by[node] | 1 << node
+            if self.seen_by_mark_targets:
+                for receiver, _ in targets[node]:
+                    forwarded_seen_by[node] |= 1 << receiver
+            if self.fanout == 'sequential':
+                send_next(node, now)
+            elif targets[node]:
+                pending_acks[node] = len(targets[node])
+                for receiver, latency in targets[node]:
+                    send(node, receiver, latency, now)
+            else:
+                acknowledge(node, now)
+
+        # The initiator receives the message from itself
+        seen[initiator] = True
+        log(initiator, initiator, 0, None, 'initiate',
+            f"Gossip initiated by {names[initiator]} ({names[initiator]}) at "
+            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_timestamp / 1e9))}")
+        start_forwarding(initiator, None, 0)
+
+        self.digests = 0
+        self.sends_saved = 0
+        if self.push_pull_interval:
+            interval = round(self.push_pull_interval * 1e6)
+            for node in range(num_nodes):
+                phase = self.rng.randrange(interval)
+                for round_number in range(self.push_pull_rounds):
+                    heapq.heappush(queue, (phase + round_number * interval, next(sequence), 'exchange', node,
+                                           None, 0, 0))
+
+        while queue:
+            now, _, kind, node, peer, send_time, message_hops = heapq.heappop(queue)
+            if kind in ('deliver', 'sync'):
+                if seen[node]:
+                    log(node, peer, now, None, 'duplicate',
+                        f"{names[node]} ignoring duplicate message: {message} from {names[peer]}")
+                    if kind == 'deliver':
+                        heapq.heappush(queue, (now, next(sequence), 'ack', peer, node, now, 0))
+                else:
+                    seen[node] = True
+                    hops[node] = message_hops
+                    if kind == 'deliver':
+                        seen_by[node] = forwarded_seen_by[peer]
+                    propagation_time = (now - send_time) / 1e6
+                    log(node, peer, now, propagation_time, 'received',
+                        f"({names[node]}({names[node]}) received: '{message}' from {names[peer]}"
+                        f" in {propagation_time:.2f} ms ")
+                    # Anti-entropy deliveries are not acknowledged to anyone waiting
+                    start_forwarding(node, peer, now, acknowledged=kind == 'deliver')
+            elif kind == 'exchange':
+                if self.neighbours[node]:
+                    peer, latency = self.rng.choice(self.neighbours[node])
+                    self.digests += 1
+                    heapq.heappush(queue, (now + round(latency * 1e6), next(sequence), 'digest', peer, node, now,
+                                           0))
+            elif kind == 'digest':
+                # `node` holds the digest of `peer`, sent at send_time
+                if seen[node] and not seen[peer]:
+                    # Pulled: returned with the reply
+                    heapq.heappush(queue, (now, next(sequence), 'sync', peer, node, send_time, hops[node] + 1))
+                elif seen[peer] and not seen[node]:
+                    # Pushed by the requester once the reply is in
+                    latency = (now - send_time) / 1e6
+                    send(peer, node, latency, now, kind='sync')
+            elif self.fanout == 'sequential':
+                send_next(node, now)
+            else:
+                pending_acks[node] -= 1
+                if pending_acks[node] == 0:
+                    acknowledge(node, now)
+
+        return events
+
+
+def summarize(events, total_nodes):
+    """Returns coverage and timing statistics of one simulated gossip."""
+    start = events[0]['received_timestamp']
+    received = [event for event in events if event['event_type'] == 'received']
+    duplicates = sum(1 for event in events if event['event_type'] == 'duplicate')
+    propagation_times = [event['propagation_time'] for event in received]
+    return {
+        'message_id': events[0]['message_id'],
+        'initiator': events[0]['receiver_id'],
+        'coverage': (len(received) + 1) / total_nodes,
+        'messages_sent': len(received) + duplicates,
+        'duplicates': duplicates,
+        # Messages sent per node reached (1.0 means no redundant message at all)
+        'message_overhead': (len(received) + duplicates) / len(received) if received else None,
+        'last_received_ms': (max(event['received_timestamp'] for event in events) - start) / 1e6,
+        'max_propagation_time': max(propagation_times, default=0.0),
+        'mean_propagation_time': sum(propagation_times) / len(propagation_times) if propagation_times else 0.0,
+    }
+
+
+def resolve_topology_path(filename):
+    """Accepts either a path or a file name inside the topology directory."""
+    if os.path.isfile(filename):
+        return filename
+    return os.path.join(os.getcwd(), 'topology', filename)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate gossip over a topology file without Kubernetes")
+    parser.add_argument('--filename', required=True, help="Topology filename (json or .cnt)")
+    parser.add_argument('--num_tests', type=int, default=1, help="Number of gossips to simulate (default: 1)")
+    parser.add_argument('--initiator', default=None, help="Initiating node name (default: random node)")
+    parser.add_argument('--message', default=None, help="Message prefix (default: random ID)")
+    parser.add_argument('--fanout', default='sequential', choices=['sequential', 'parallel'],
+                        help="Fan-out mode of the nodes (default: sequential)")
+    parser.add_argument('--strategy', default='flood', choices=STRATEGIES,
+                        help="Forwarding strategy of the nodes (default: flood)")
+    parser.add_argument('--gossip_fanout', type=int, default=3,
+                        help="Neighbors forwarded to with the fanout strategy (default: 3)")
+    parser.add_argument('--probability', type=float, default=0.5,
+                        help="Forwarding probability of the probabilistic strategy (default: 0.5)")
+    parser.add_argument('--ttl', type=int, default=0, help="Hop limit (default: 0, unlimited)")
+    parser.add_argument('--push_pull_interval', type=float, default=None,
+                        help="Milliseconds between push-pull exchanges of a node (default: disabled)")
+    parser.add_argument('--push_pull_rounds', type=int, default=10,
+                        help="Push-pull exchanges per node and gossip (default: 10)")
+    parser.add_argument('--seen_by', action='store_true',
+                        help="Skip the neighbors marked in the seen-by summary of each message (SEEN_BY=bitmap)")
+    parser.add_argument('--seen_by_mark_targets', action='store_true',
+                        help="Forwarders also mark the neighbors they send to (SEEN_BY_MARK=targets)")
+    parser.add_argument('--latency_option', default='weight', help="Edge attribute used as latency (default: weight)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Random seed for initiator selection and strategy draws (optional)")
+    parser.add_argument('--summary_only', action='store_true', help="Print only the per-gossip summaries")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    strategy = ForwardingStrategy(args.strategy, fanout=args.gossip_fanout, probability=args.probability,
+                                  ttl=args.ttl)
+    simulator = GossipSimulator.from_topology_file(resolve_topology_path(args.filename),
+                                                   latency_option=args.latency_option, fanout=args.fanout,
+                                                   strategy=strategy, push_pull_interval=args.push_pull_interval,
+                                                   push_pull_rounds=args.push_pull_rounds, seen_by=args.seen_by,
+                                                   seen_by_mark_targets=args.seen_by_mark_targets, seed=args.seed)
+    total_nodes = len(simulator.node_names)
+    unique_id = args.message or str(uuid.uuid4())[:4]
+
+    for nt in range(args.num_tests):
+        initiator = args.initiator or rng.choice(simulator.node_names)
+        message = f'{unique_id}-cubaan{total_nodes}-{nt}'
+        events = simulator.run(initiator, message, message_id=uuid.uuid4().hex)
+        if not args.summary_only:
+            for event_data in events:
+                print(json.dumps(event_data))
+        summary = summarize(events, total_nodes)
+        summary['event'] = 'simulation_summary'
+        summary['strategy'] = args.strategy
+        if args.push_pull_interval:
+            summary['digests'] = simulator.digests
+        if args.seen_by:
+            summary['sends_saved'] = simulator.sends_saved
+        summary['message'] = message
+        print(json.dumps(summary), flush=True)
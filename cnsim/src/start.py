@@ -2,10 +2,11 @@ import grpc
 import argparse
 import time
 import socket
+import uuid
 import gossip_pb2
 import gossip_pb2_grpc
 
-def send_message_to_self(message):
+def send_message_to_self(message, message_id=None):
     """Sends a message to the current pod (itself)."""
     pod_name = socket.gethostname()
     print(f"pod_name: {pod_name}", flush=True)
@@ -14,12 +15,15 @@ def send_message_to_self(message):
     target = f"{pod_ip}:5050"
     print(f"target={target}", flush=True)
     target_latency = 0.00
+    # Unique ID used by the nodes to detect duplicates of this gossip
+    message_id = message_id or uuid.uuid4().hex
 
     with grpc.insecure_channel(target) as channel:
         stub = gossip_pb2_grpc.GossipServiceStub(channel)
         print(f"Sending message to self ({pod_name}, {pod_ip}): '{message}' with latency={target_latency} ms", flush=True)
         response = stub.SendMessage(gossip_pb2.GossipMessage(
             message=message,
+            message_id=message_id,
             sender_id=pod_ip,
             timestamp=time.time_ns(),
             latency_ms=target_latency
@@ -29,5 +33,6 @@ def send_message_to_self(message):
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Send a message to self (the current pod).")
     parser.add_argument('--message', required=True, help="Message to send")
+    parser.add_argument('--message_id', default=None, help="Unique message ID (default: random UUID)")
     args = parser.parse_args()
-    send_message_to_self(args.message)
\ No newline at end of file
+    send_message_to_self(args.message, args.message_id)
\ No newline at end of file
@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+import grpc
+
+
+def message_key(request):
+    # Older senders do not set message_id; the receiver falls back to the message text too
+    return request.message_id or request.message
+
+
+class StreamSender:
+    """
+    Pipelines gossip messages to one neighbor over a single long-lived
+    GossipStream call. send() only queues the message; a background thread
+    feeds the stream and collects the acknowledgments, so the caller never
+    waits for the neighbor (or its downstream propagation).
+
+    When the stream breaks, the messages not acknowledged yet are sent once
+    more on a new stream, the same single retry as the unary transport.
+    """
+
+    def __init__(self, peer_ip, channel_pool, on_failure=None, reconnect_delay=1.0):
+        """
+        Args:
+            peer_ip: Neighbor IP.
+            channel_pool: ChannelPool providing the stub of the neighbor.
+            on_failure: Called with (peer_ip, request, error) for every message given up.
+            reconnect_delay: Seconds to wait before opening a new stream after a failure.
+        """
+        self.peer_ip = peer_ip
+        self.channel_pool = channel_pool
+        self.on_failure = on_failure
+        self.reconnect_delay = reconnect_delay
+        # (request, attempt), or None to close the sender
+        self._queue = queue.Queue()
+        # message key -> (request, attempt) of the messages written to the current stream
+        self._unacked = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f'stream-{peer_ip}', daemon=True)
+        self._thread.start()
+
+    def send(self, request):
+        self._queue.put((request, 0))
+
+    def close(self):
+        """Ends the stream once the messages queued so far are written."""
+        self._queue.put(None)
+
+    def pending(self):
+        """Number of messages queued or waiting for their acknowledgment."""
+        with self._lock:
+            return self._queue.qsize() + len(self._unacked)
+
+    def _requests(self, first, stopped):
+        item = first
+        while True:
+            with self._lock:
+                # Checked under the lock _run takes the unacknowledged messages back with,
+                # so an item is never registered on a stream that already failed
+                if stopped.is_set():
+                    # The call this iterator fed is over; leave the item to the next stream
+                    self._queue.put(item)
+                    return
+                if item is None:
+                    return
+                self._unacked[message_key(item[0])] = item
+            yield item[0]
+            while True:
+                try:
+                    item = self._queue.get(timeout=0.5)
+                    break
+                except queue.Empty:
+                    if stopped.is_set():
+                        return
+
+    def _run(self):
+        while True:
+            # A stream is only opened when there is something to send, so an
+            # unreachable neighbor costs nothing until the next message for it
+            first = self._queue.get()
+            if first is None:
+                return
+            stopped = threading.Event()
+            try:
+                with self.channel_pool.stub(self.peer_ip) as stub:
+                    for ack in stub.GossipStream(self._requests(first, stopped)):
+                        with self._lock:
+                            for message_id in ack.message_ids:
+                                self._unacked.pop(message_id, None)
+                # Closed by close(): every queued message was written and acknowledged
+                return
+            except grpc.RpcError as e:
+                stopped.set()
+                print(f"Gossip stream to {self.peer_ip} failed: {e.code()} {e.details()}", flush=True)
+                self.channel_pool.report_error(self.peer_ip, e)
+                with self._lock:
+                    lost, self._unacked = list(self._unacked.values()), {}
+                for request, attempt in lost:
+                    if attempt == 0:
+                        self._queue.put((request, 1))
+                    elif self.on_failure is not None:
+                        self.on_failure(self.peer_ip, request, e)
+                time.sleep(self.reconnect_delay)
+
+
+class StreamPool:
+    """Keeps one StreamSender per neighbor, next to the ChannelPool it sends through."""
+
+    def __init__(self, channel_pool, on_failure=None):
+        self.channel_pool = channel_pool
+        self.on_failure = on_failure
+        # peer_ip -> StreamSender
+        self._senders = {}
+        self._lock = threading.Lock()
+
+    def send(self, peer_ip, request):
+        with self._lock:
+            sender = self._senders.get(peer_ip)
+            if sender is None:
+                sender = self._senders[peer_ip] = StreamSender(peer_ip, self.channel_pool, self.on_failure)
+        sender.send(request)
+
+    def pending(self):
+        with self._lock:
+            senders = list(self._senders.values())
+        return sum(sender.pending() for sender in senders)
+
+    def retain(self, peer_ips):
+        """Closes the streams of peers that are no longer in the neighbor list."""
+        keep = set(peer_ips)
+        with self._lock:
+            for peer_ip in [ip for ip in self._senders if ip not in keep]:
+                self._senders.pop(peer_ip).close()
@@ -0,0 +1,312 @@
+import argparse
+import itertools
+import os
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+import numpy as np
+from batch_engine import BatchEngine
+from result_writer import ResultWriter, pa
+from simulator import GossipSimulator, summarize
+from topology_binary import BINARY_SUFFIX, load_topology_binary
+from topology_stream import load_topology_json
+
+# One output row per (topology, fanout, engine, initiator)
+KEY_COLUMNS = ['topology', 'fanout', 'engine', 'initiator']
+COLUMNS = KEY_COLUMNS + ['model', 'nodes', 'others', 'minlat', 'maxlat', 'seed', 'edges',
+                         'coverage', 'messages_sent', 'duplicates', 'last_received_ms']
+
+PARQUET_SCHEMA = pa.schema([
+    ('topology', pa.string()), ('fanout', pa.string()), ('engine', pa.string()), ('initiator', pa.string()),
+    ('model', pa.string()), ('nodes', pa.int64()), ('others', pa.float64()), ('minlat', pa.int64()),
+    ('maxlat', pa.int64()), ('seed', pa.int64()), ('edges', pa.int64()), ('coverage', pa.float64()),
+    ('messages_sent', pa.int64()), ('duplicates', pa.int64()), ('last_received_ms', pa.float64()),
+]) if pa is not None else None
+
+# Topologies attached by this worker process, least recently used first:
+# topology id -> (shared memory blocks, arrays)
+_attached = OrderedDict()
+# Topologies a worker keeps attached (the sweep has at most this many in flight)
+_max_attached = 1
+# Simulators / engines built by this worker process: (topology id, fanout, engine) -> runner
+_runners = {}
+
+
+def share_arrays(arrays):
+    """
+    Copies numpy arrays into new shared memory blocks.
+
+    Returns:
+        (blocks, spec): the SharedMemory blocks, owned (and unlinked) by the caller,
+        and a picklable {array name: (block name, dtype, shape)} spec for attach_arrays.
+    """
+    blocks, spec = [], {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        spec[name] = (block.name, array.dtype.str, array.shape)
+    return blocks, spec
+
+
+def attach_arrays(spec):
+    """Maps the arrays of a share_arrays spec without copying them."""
+    blocks, arrays = [], {}
+    for name, (block_name, dtype, shape) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def topology_arrays_from_file(path, latency_option='weight'):
+    """Loads a topology json (node-link) or binary (.cnt) file as edge arrays."""
+    if path.endswith(BINARY_SUFFIX):
+        topology = load_topology_binary(path)
+        return {'names': topology.names, 'sources': topology.sources,
+                'targets': topology.targets, 'weights': topology.weights}
+    topology = load_topology_json(path)
+    node_names = [node['id'] for node in topology['nodes']]
+    position = {name: i for i, name in enumerate(node_names)}
+    edges = topology['edges']
+    return {'names': np.array([name.encode('utf-8') for name in node_names]),
+            'sources': np.array([position[edge['source']] for edge in edges], dtype=np.int32),
+            'targets': np.array([position[edge['target']] for edge in edges], dtype=np.int32),
+            'weights': np.array([edge.get(latency_option) or 0 for edge in edges], dtype=np.float32)}
+
+
+def topology_arrays_from_graph(graph):
+    """Converts a networkx graph (e.g. from network_constructor.py) to edge arrays."""
+    position = {node: i for i, node in enumerate(graph.nodes)}
+    edges = list(graph.edges(data='weight', default=0))
+    return {'names': np.array([str(node).encode('utf-8') for node in graph.nodes]),
+            'sources': np.array([position[u] for u, _, _ in edges], dtype=np.int32),
+            'targets': np.array([position[v] for _, v, _ in edges], dtype=np.int32),
+            'weights': np.array([weight for _, _, weight in edges], dtype=np.float32)}
+
+
+def generate_topology(model, nodes, others, minlat, maxlat, seed, fast=False):
+    """Generates a topology with network_constructor.py; returns None if it is not connected."""
+    import network_constructor
+
+    if fast:
+        if model == 'BA':
+            graph = network_constructor.construct_BA_network_fast(nodes, int(others), minlat, maxlat, seed)
+        else:
+            graph = network_constructor.construct_ER_network_fast(nodes, others, minlat, maxlat, seed)
+        return network_constructor.set_network_mapping(graph, nodes)
+
+    random.seed(seed)
+    if model == 'BA':
+        graph = network_constructor.construct_BA_network(nodes, int(others))
+    else:
+        graph = network_constructor.construct_ER_network(nodes, others)
+    if not graph:
+        return None
+    network = network_constructor.set_network_mapping(graph, nodes)
+    return network_constructor.set_network_latency(network, minlat, maxlat)
+
+
+def init_worker(max_attached):
+    global _max_attached
+    _max_attached = max_attached
+
+
+def _get_runner(topology_id, spec, fanout, engine):
+    if topology_id not in _attached:
+        # Detach the least recently used topologies, so that the memory of the
+        # finished ones (unlinked by the sweep) is released
+        while len(_attached) >= _max_attached:
+            old_id, (old_blocks, _) = _attached.popitem(last=False)
+            for key in [key for key in _runners if key[0] == old_id]:
+                del _runners[key]
+            for block in old_blocks:
+                block.close()
+        _attached[topology_id] = attach_arrays(spec)
+    _attached.move_to_end(topology_id)
+    key = (topology_id, fanout, engine)
+    if key not in _runners:
+        arrays = _attached[topology_id][1]
+        node_names = [name.decode('utf-8') for name in arrays['names']]
+        if engine == 'batch':
+            _runners[key] = BatchEngine(node_names, arrays['sources'], arrays['targets'], arrays['weights'])
+        else:
+            neighbours = [[] for _ in node_names]
+            for source, target, latency in zip(arrays['sources'].tolist(), arrays['targets'].tolist(),
+                                               arrays['weights'].tolist()):
+                neighbours[source].append((target, latency))
+                neighbours[target].append((source, latency))
+            _runners[key] = GossipSimulator(node_names, neighbours, fanout=fanout)
+    return _runners[key]
+
+
+def run_job(topology_id, spec, fanout, engine, initiators):
+    """
+    Worker entry point: simulates one gossip per initiator index on a shared
+    topology and returns one result dictionary per gossip.
+    """
+    runner = _get_runner(topology_id, spec, fanout, engine)
+    total_nodes = len(runner.node_names)
+    results = []
+    if engine == 'batch':
+        for initiator, summary in zip(initiators, runner.summarize(runner.run(initiators))):
+            results.append(dict(summary, initiator=runner.node_names[initiator]))
+    else:
+        for initiator in initiators:
+            summary = summarize(runner.run(initiator, f'{topology_id}-{initiator}', start_timestamp=0),
+                                total_nodes)
+            results.append(summary)
+    return [{'initiator': result['initiator'], 'coverage': result['coverage'],
+             'messages_sent': result['messages_sent'], 'duplicates': result['duplicates'],
+             'last_received_ms': result['last_received_ms']} for result in results]
+
+
+def topology_grid(args):
+    """Yields (topology id, parameters, loader) for every topology of the sweep."""
+    for filename in args.filenames:
+        path = filename if os.path.isfile(filename) else os.path.join(os.getcwd(), 'topology', filename)
+        parameters = {'model': None, 'nodes': None, 'others': None, 'minlat': None, 'maxlat': None, 'seed': None}
+        yield os.path.basename(path), parameters, lambda path=path: topology_arrays_from_file(path, args.latency_option)
+
+    if args.model:
+        for model, nodes, others, (minlat, maxlat), seed in itertools.product(
+                args.model, args.nodes, args.others, args.latency, args.seeds):
+            topology_id = f"{model}-n{nodes}-{others}-lat{minlat}-{maxlat}-s{seed}"
+            parameters = {'model': model, 'nodes': nodes, 'others': others,
+                          'minlat': minlat, 'maxlat': maxlat, 'seed': seed}
+
+            def load(model=model, nodes=nodes, others=others, minlat=minlat, maxlat=maxlat, seed=seed):
+                graph = generate_topology(model, nodes, others, minlat, maxlat, seed, args.fast)
+                return topology_arrays_from_graph(graph) if graph else None
+            yield topology_id, parameters, load
+
+
+def prepare_topologies(args, completed):
+    """
+    Loads (or generates) the topologies of the sweep one at a time and yields
+    (topology id, output row base, arrays, {fanout: initiators still to run}),
+    skipping the topologies that fail to load and those already done.
+    """
+    for topology_id, parameters, load in topology_grid(args):
+        try:
+            arrays = load()
+        except Exception as e:
+            print(f"Skipping {topology_id}: topology generation failed ({e})", flush=True)
+            continue
+        if arrays is None:
+            print(f"Skipping {topology_id}: topology generation failed", flush=True)
+            continue
+        node_names = [name.decode('utf-8') for name in arrays['names']]
+        rng = random.Random(f"{topology_id}-initiators")
+        if 0 < args.num_initiators < len(node_names):
+            initiators = sorted(rng.sample(range(len(node_names)), args.num_initiators))
+        else:
+            initiators = list(range(len(node_names)))
+
+        pending = {fanout: [i for i in initiators
+                            if (topology_id, fanout, args.engine, node_names[i]) not in completed]
+                   for fanout in args.fanout}
+        if any(pending.values()):
+            row_base = dict(parameters, topology=topology_id, engine=args.engine, edges=len(arrays['sources']))
+            yield topology_id, row_base, arrays, pending
+
+
+def release_blocks(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+def latency_range(value):
+    minlat, _, maxlat = value.partition('-')
+    try:
+        return int(minlat), int(maxlat or minlat)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a latency range like 1-100")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Parallel, resumable simulation sweep over topologies, fan-out modes and initiators")
+    parser.add_argument('--filenames', nargs='*', default=[], help="Topology files (json or .cnt) to sweep")
+    parser.add_argument('--model', nargs='*', default=[], choices=['ER', 'BA'], help="Generate topologies of these models")
+    parser.add_argument('--nodes', nargs='*', type=int, default=[100], help="Node counts of generated topologies")
+    parser.add_argument('--others', nargs='*', type=float, default=[0.1],
+                        help="ER probabilities or BA parameters of generated topologies")
+    parser.add_argument('--latency', nargs='*', type=latency_range, default=[(1, 100)],
+                        help="Latency ranges (ms) of generated topologies, e.g. 1-100 (default: 1-100)")
+    parser.add_argument('--fast', action='store_true', help="Use the scalable topology generators")
+    parser.add_argument('--seeds', nargs='*', type=int, default=[0], help="Seeds of generated topologies (default: 0)")
+    parser.add_argument('--fanout', nargs='*', default=['sequential'], choices=['sequential', 'parallel'],
+                        help="Fan-out modes to simulate (default: sequential)")
+    parser.add_argument('--engine', default='simulator', choices=['simulator', 'batch'],
+                        help="simulator (event replay) or batch (vectorized, parallel fan-out only)")
+    parser.add_argument('--num_initiators', type=int, default=10,
+                        help="Initiators per topology, 0 for every node (default: 10)")
+    parser.add_argument('--latency_option', default='weight', help="Edge attribute used as latency (default: weight)")
+    parser.add_argument('--output', default='sweep_results.csv', help="Output .csv file or .parquet directory")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk_size', type=int, default=16, help="Initiators per job (default: 16)")
+    parser.add_argument('--max_topologies', type=int, default=None,
+                        help="Topologies loaded in shared memory at once (default: number of workers)")
+    args = parser.parse_args()
+
+    if args.engine == 'batch' and args.fanout != ['parallel']:
+        parser.error("--engine batch only models --fanout parallel")
+    if not args.filenames and not args.model:
+        parser.error("Give --filenames and/or --model")
+    if args.max_topologies is None:
+        args.max_topologies = args.workers
+    args.max_topologies = max(1, args.max_topologies)
+
+    writer = ResultWriter(args.output, COLUMNS, PARQUET_SCHEMA, KEY_COLUMNS)
+    completed = writer.completed_keys()
+    print(f"{len(completed)} results already in {args.output}", flush=True)
+
+    # topology id -> [shared memory blocks, jobs not done yet]
+    in_flight = {}
+    start_time = time.time()
+    submitted = written = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                 initargs=(args.max_topologies,)) as executor:
+            topologies = prepare_topologies(args, completed)
+            futures = {}
+            while True:
+                # Load the next topologies only while fewer than --max_topologies are in flight,
+                # so that a large grid never holds more than that many in shared memory
+                while len(in_flight) < args.max_topologies:
+                    topology_id, row_base, arrays, pending = next(topologies, (None,) * 4)
+                    if topology_id is None:
+                        break
+                    # Workers map the topology from shared memory instead of receiving a copy per job
+                    topology_blocks, spec = share_arrays(arrays)
+                    in_flight[topology_id] = [topology_blocks, 0]
+                    for fanout, fanout_initiators in pending.items():
+                        for start in range(0, len(fanout_initiators), args.chunk_size):
+                            future = executor.submit(run_job, topology_id, spec, fanout, args.engine,
+                                                     fanout_initiators[start:start + args.chunk_size])
+                            futures[future] = (topology_id, dict(row_base, fanout=fanout))
+                            in_flight[topology_id][1] += 1
+                            submitted += 1
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    topology_id, row = futures.pop(future)
+                    rows = [dict(row, **result) for result in future.result()]
+                    writer.write(rows)
+                    written += len(rows)
+                    in_flight[topology_id][1] -= 1
+                    if not in_flight[topology_id][1]:
+                        release_blocks(in_flight.pop(topology_id)[0])
+    finally:
+        writer.close()
+        for topology_blocks, _ in in_flight.values():
+            release_blocks(topology_blocks)
+
+    print(f"Wrote {written} results of {submitted} jobs to {args.output} in {time.time() - start_time:.1f} s",
+          flush=True)
@@ -0,0 +1,125 @@
+import argparse
+import os
+import struct
+from collections import namedtuple
+import numpy as np
+from topology_stream import load_topology_json, strip_compression_suffix
+
+# File layout (little endian, every section 4-byte aligned):
+#   header  : magic, number of nodes (N), number of edges (E), name width (W), reserved
+#   sources : E x int32    - source node index of each edge
+#   targets : E x int32    - target node index of each edge
+#   weights : E x float32  - edge weight (latency, ms)
+#   names   : N x W bytes  - node names, utf-8, NUL padded
+MAGIC = b'CNTOPO\x00\x01'
+HEADER = struct.Struct('<8sQQII')
+BINARY_SUFFIX = '.cnt'
+
+TopologyArrays = namedtuple('TopologyArrays', ['names', 'sources', 'targets', 'weights'])
+
+
+def binary_path_for(topology_path):
+    """Returns the binary topology path for a topology JSON file."""
+    root, _ = os.path.splitext(strip_compression_suffix(topology_path))
+    return root + BINARY_SUFFIX
+
+
+def save_topology_binary(path, node_names, sources, targets, weights):
+    """
+    Writes a topology in the binary edge-list layout.
+
+    Args:
+        path: Output file path.
+        node_names: Node names, in topology order.
+        sources, targets: Node indices of the edge end points.
+        weights: Edge weights (latency, ms).
+    """
+    encoded_names = [name.encode('utf-8') for name in node_names]
+    name_width = max((len(name) for name in encoded_names), default=1)
+    # Pad names to a multiple of 4 bytes so nothing after them is misaligned
+    name_width += -name_width % 4
+
+    sources = np.asarray(sources, dtype='<i4')
+    targets = np.asarray(targets, dtype='<i4')
+    weights = np.asarray(weights, dtype='<f4')
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(encoded_names), len(sources), name_width, 0))
+        f.write(sources.tobytes())
+        f.write(targets.tobytes())
+        f.write(weights.tobytes())
+        f.write(np.array(encoded_names, dtype=f'S{name_width}').tobytes())
+
+
+def load_topology_binary(path):
+    """
+    Memory-maps a binary topology. Nothing is parsed or copied; pages are read
+    from disk only when the arrays are accessed.
+
+    Returns:
+        TopologyArrays(names, sources, targets, weights) of read-only numpy memmaps.
+    """
+    with open(path, 'rb') as f:
+        magic, num_nodes, num_edges, name_width, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"Not a binary topology: {path}")
+
+    offset = HEADER.size
+    sources = np.memmap(path, dtype='<i4', mode='r', offset=offset, shape=(num_edges,))
+    offset += 4 * num_edges
+    targets = np.memmap(path, dtype='<i4', mode='r', offset=offset, shape=(num_edges,))
+    offset += 4 * num_edges
+    weights = np.memmap(path, dtype='<f4', mode='r', offset=offset, shape=(num_edges,))
+    offset += 4 * num_edges
+    names = np.memmap(path, dtype=f'S{name_width}', mode='r', offset=offset, shape=(num_nodes,))
+    return TopologyArrays(names, sources, targets, weights)
+
+
+def find_node_index(topology, node_name):
+    """Returns the index of a node (StatefulSet ordinal first, then a vectorized search), or None."""
+    encoded = node_name.encode('utf-8')
+    _, _, ordinal = node_name.rpartition('-')
+    if ordinal.isdigit() and int(ordinal) < len(topology.names) and topology.names[int(ordinal)] == encoded:
+        return int(ordinal)
+    matches = np.flatnonzero(topology.names == encoded)
+    return int(matches[0]) if len(matches) else None
+
+
+def node_neighbours(topology, node_name):
+    """
+    Returns the (neighbor_name, weight) pairs of a node, using a vectorized scan
+    of the memory-mapped edge arrays.
+    """
+    node_index = find_node_index(topology, node_name)
+    if node_index is None:
+        return []
+    as_source = np.flatnonzero(topology.sources == node_index)
+    as_target = np.flatnonzero(topology.targets == node_index)
+    neighbour_indices = np.concatenate((topology.targets[as_source], topology.sources[as_target]))
+    neighbour_weights = np.concatenate((topology.weights[as_source], topology.weights[as_target]))
+    return [(topology.names[i].decode('utf-8'), float(weight))
+            for i, weight in zip(neighbour_indices, neighbour_weights)]
+
+
+def convert_json_to_binary(topology_path, output_path=None, latency_option='weight'):
+    """Converts a node-link topology JSON file to the binary layout."""
+    topology = load_topology_json(topology_path)
+    node_names = [node['id'] for node in topology['nodes']]
+    position = {name: i for i, name in enumerate(node_names)}
+    edges = topology['edges']
+    sources = [position[edge['source']] for edge in edges]
+    targets = [position[edge['target']] for edge in edges]
+    weights = [edge.get(latency_option) or 0 for edge in edges]
+    output_path = output_path or binary_path_for(topology_path)
+    save_topology_binary(output_path, node_names, sources, targets, weights)
+    return output_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert topology JSON files to the binary (.cnt) format")
+    parser.add_argument('topologies', nargs='+', help="Topology JSON file(s)")
+    parser.add_argument('--latency_option', default='weight', help="Edge attribute used as latency (default: weight)")
+    args = parser.parse_args()
+
+    for topology_path in args.topologies:
+        print(f"Binary topology saved to {convert_json_to_binary(topology_path, latency_option=args.latency_option)}")
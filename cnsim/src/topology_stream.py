@@ -0,0 +1,154 @@
+import argparse
+import gzip
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Streamed topologies are regular node-link JSON documents, written with one node
+# or edge record per line so that they can be produced and filtered line by line:
+#   {"directed": false, "multigraph": false, "graph": {}, "nodes": [
+#   {"id": "gossip-statefulset-0"},
+#   ...
+#   ], "edges": [
+#   {"source": "gossip-statefulset-0", "target": "gossip-statefulset-5", "weight": 12},
+#   ...
+#   ], "weight_average": 50.5, "total_edges": 4, "total_nodes": 3}
+STREAM_HEADER = '{"directed": false, "multigraph": false, "graph": {}, "nodes": [\n'
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def strip_compression_suffix(path):
+    """Returns a topology path without its .gz / .zst suffix."""
+    root, ext = os.path.splitext(path)
+    return root if ext in COMPRESSION_SUFFIXES.values() else path
+
+
+def open_topology(path, mode='r'):
+    """Opens a topology file as text, (de)compressing .gz and .zst files transparently."""
+    if path.endswith(COMPRESSION_SUFFIXES['gzip']):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if path.endswith(COMPRESSION_SUFFIXES['zstd']):
+        if zstandard is None:
+            raise ValueError(f"Reading or writing {path} needs the zstandard package")
+        return zstandard.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def load_topology_json(path):
+    """Loads a whole (possibly compressed) node-link topology file."""
+    with open_topology(path) as f:
+        return json.load(f)
+
+
+def write_topology_stream(path, node_names, edges, compression=None):
+    """
+    Writes a node-link topology incrementally: every node and edge is serialised
+    as soon as it is produced, so the full document never exists in memory.
+
+    Args:
+        path: Output file path (the compression suffix is appended if missing).
+        node_names: Iterable of node names.
+        edges: Iterable of (source_name, target_name, weight).
+        compression: None, 'gzip' or 'zstd'.
+
+    Returns:
+        The path of the written file.
+    """
+    if compression:
+        suffix = COMPRESSION_SUFFIXES[compression]
+        path = path if path.endswith(suffix) else path + suffix
+
+    total_nodes = total_edges = weighted_edges = 0
+    total_weight = 0
+    with open_topology(path, 'w') as f:
+        f.write(STREAM_HEADER)
+        separator = ''
+        for name in node_names:
+            f.write(f'{separator}{json.dumps({"id": name})}')
+            separator = ',\n'
+            total_nodes += 1
+        f.write('\n], "edges": [\n')
+        separator = ''
+        for source, target, weight in edges:
+            edge = {'source': source, 'target': target}
+            if weight is not None:
+                edge['weight'] = weight
+                total_weight += weight
+                weighted_edges += 1
+            f.write(f'{separator}{json.dumps(edge)}')
+            separator = ',\n'
+            total_edges += 1
+        weight_average = total_weight / weighted_edges if weighted_edges else 0
+        f.write(f'\n], "weight_average": {json.dumps(weight_average)}, '
+                f'"total_edges": {total_edges}, "total_nodes": {total_nodes}}}\n')
+    return path
+
+
+def is_topology_stream(path):
+    """Checks whether a topology file has the one-record-per-line layout."""
+    with open_topology(path) as f:
+        return f.readline() == STREAM_HEADER
+
+
+def read_node_neighbours_stream(path, node_name, latency_option='weight'):
+    """
+    Returns the (neighbor_name, latency) pairs of a node from a streamed topology.
+
+    Lines are filtered on the quoted node name before any JSON parsing, so only
+    this node's edge records are decoded and nothing else is kept in memory.
+    """
+    needle = json.dumps(node_name)
+    neighbours = []
+    with open_topology(path) as f:
+        in_edges = False
+        for line in f:
+            if not in_edges:
+                in_edges = line.startswith('], "edges": [')
+                continue
+            if line.startswith(']'):
+                break
+            if needle not in line:
+                continue
+            edge = json.loads(line.rstrip(',\n'))
+            if edge['source'] == node_name:
+                neighbours.append((edge['target'], edge.get(latency_option)))
+            elif edge['target'] == node_name:
+                neighbours.append((edge['source'], edge.get(latency_option)))
+    return neighbours
+
+
+def read_node_names_stream(path):
+    """Returns the node names of a streamed topology (only the node records are parsed)."""
+    names = []
+    with open_topology(path) as f:
+        f.readline()
+        for line in f:
+            if line.startswith(']'):
+                break
+            names.append(json.loads(line.rstrip(',\n'))['id'])
+    return names
+
+
+def convert_to_stream(topology_path, output_path=None, compression=None):
+    """Rewrites an existing (indented) node-link topology file in the streamed layout."""
+    topology = load_topology_json(topology_path)
+    output_path = output_path or strip_compression_suffix(topology_path)
+    return write_topology_stream(output_path, (node['id'] for node in topology['nodes']),
+                                 ((edge['source'], edge['target'], edge.get('weight'))
+                                  for edge in topology['edges']),
+                                 compression)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rewrite topology JSON files in the streamed (one record per line) layout")
+    parser.add_argument('topologies', nargs='+', help="Topology JSON file(s)")
+    parser.add_argument('--compress', default=None, choices=list(COMPRESSION_SUFFIXES),
+                        help="Compress the output (default: none)")
+    args = parser.parse_args()
+
+    for topology_path in args.topologies:
+        print(f"Streamed topology saved to {convert_to_stream(topology_path, compression=args.compress)}")